@@ -1,8 +1,14 @@
 from fastapi import APIRouter, HTTPException, status, Query
 from pydantic import BaseModel, EmailStr
 import secrets, time
+from pymongo.errors import DuplicateKeyError
 from app.database import db
-from app.auth.utils import hash_password, verify_password, create_access_token
+from app.auth.utils import (
+    create_access_token,
+    hash_password_async,
+    invalidate_user,
+    verify_and_update_password,
+)
 
 router = APIRouter()
 
@@ -32,7 +38,7 @@ async def register(payload: AuthRegister):
     users = db.users
     # pending = db.pending_users
 
-    if users.find_one({"email": payload.email}):
+    if await users.find_one({"email": payload.email}):
         raise HTTPException(status_code= 400, detail="Email already resgitered")
     
     # if pending.find_one({"email": payload.email}):
@@ -53,13 +59,20 @@ async def register(payload: AuthRegister):
     
     # send_verification_email(payload.email, otp)
 
-    result = users.insert_one({
-        "name": payload.name,
-        "email": payload.email,
-        "username": payload.username,
-        "hashed_password": hash_password(payload.password),
-        "created_at": int(time.time())
-    })
+    hashed_password = await hash_password_async(payload.password)
+
+    # the find_one above skips hashing for known emails; the unique
+    # email index catches concurrent signups that slip past it
+    try:
+        result = await users.insert_one({
+            "name": payload.name,
+            "email": payload.email,
+            "username": payload.username,
+            "hashed_password": hashed_password,
+            "created_at": int(time.time())
+        })
+    except DuplicateKeyError:
+        raise HTTPException(status_code= 400, detail="Email already resgitered")
 
     return {
         "message": "Signup Sucessful"
@@ -94,13 +107,18 @@ async def register(payload: AuthRegister):
 @router.post("/login", response_model=TokenOut)
 async def login(payload: AuthIn):
     users = db.users
-    user = users.find_one({"email": payload.email})
+    user = await users.find_one({"email": payload.email})
 
     if not user:
         raise HTTPException(status_code=400, detail="invalid credentials")
     
-    if not verify_password(payload.password, user["hashed_password"]):
+    valid, new_hash = await verify_and_update_password(payload.password, user["hashed_password"])
+    if not valid:
         raise HTTPException(status_code=400, detail="invalid Credentials")
+
+    if new_hash:
+        await users.update_one({"_id": user["_id"]}, {"$set": {"hashed_password": new_hash}})
+        invalidate_user(user["_id"])
     
     token = create_access_token(
         data={
@@ -1,10 +1,14 @@
 from passlib.context import CryptContext
 from jose import jwt
+import asyncio
 import time
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer
 from app.database import db
+from app.utils.cache import TTLCache
 from bson import ObjectId
 from email.message import EmailMessage
 # import smtplib
@@ -15,16 +19,74 @@ SECRET = os.getenv("SECRET_KEY", "default_secret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_SECONDS = 3600  # 1 hour
 
-pwd_ctx = CryptContext(schemes=["argon2"], deprecated="auto")
+# changing these rehashes existing passwords on their next login
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+pwd_ctx = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
+
+# argon2 runs off the event loop; past HASH_QUEUE_LIMIT pending jobs
+# new register/login calls get a 429 instead of queueing
+HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", str(HASH_WORKERS * 8)))
+
+if HASH_EXECUTOR == "process":
+    _hash_executor = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+else:
+    _hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="argon2")
+
+_hash_pending = 0
 
 auth_scheme = HTTPBearer()
 
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_MAXSIZE = int(os.getenv("USER_CACHE_MAXSIZE", "10000"))
+TRUST_TOKEN_CLAIMS = os.getenv("TRUST_TOKEN_CLAIMS", "false").lower() in ("1", "true", "yes")
+
+user_cache = TTLCache(maxsize=USER_CACHE_MAXSIZE, ttl=USER_CACHE_TTL)
+user_lookup_stats = {"db_reads": 0, "cache_hits": 0, "claims_only": 0}
+
 def hash_password(password: str) -> str:
     return pwd_ctx.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_ctx.verify(plain_password, hashed_password)
 
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_ctx.verify_and_update(plain_password, hashed_password)
+
+async def _run_hashing(fn, *args):
+    global _hash_pending
+    if _hash_pending >= HASH_QUEUE_LIMIT:
+        raise HTTPException(status_code=429, detail="Too many sign-in attempts, try again shortly", headers={"Retry-After": "1"})
+
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _hash_pending -= 1
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(hash_password, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    # returns (valid, new_hash); new_hash is set when the stored hash uses outdated parameters
+    return await _run_hashing(_verify_and_update, plain_password, hashed_password)
+
+def shutdown_hash_executor():
+    _hash_executor.shutdown(wait=False, cancel_futures=True)
+
+def hash_pool_stats() -> dict:
+    return {"executor": HASH_EXECUTOR, "workers": HASH_WORKERS, "pending": _hash_pending, "queue_limit": HASH_QUEUE_LIMIT}
+
 def create_access_token(data: dict):
     now = int(time.time())
     payload = {
@@ -39,23 +101,53 @@ def decode_token(token: str) -> dict:
     return jwt.decode(token, SECRET, algorithms=[ALGORITHM])
 
 
-def get_current_user(credentials = Depends(auth_scheme)):
-    token = credentials.credentials
-
+def _decode_credentials(credentials) -> dict:
     try:
-        payload = decode_token(token)
-        user_id = payload.get("id")
-        email = payload.get("email")
+        payload = decode_token(credentials.credentials)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-    if not user_id or not email:
+    if not payload.get("id") or not payload.get("email"):
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    user = db.users.find_one({"_id": ObjectId(user_id)})
+    return payload
+
+
+def invalidate_user(user_id):
+    # call after updating or deleting a user document
+    user_cache.delete(str(user_id))
+
+
+async def get_current_user(credentials = Depends(auth_scheme)):
+    payload = _decode_credentials(credentials)
+    user_id = payload["id"]
+
+    user = user_cache.get(user_id)
+    if user is not None:
+        user_lookup_stats["cache_hits"] += 1
+        return user
+
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, {"hashed_password": 0})
+    user_lookup_stats["db_reads"] += 1
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    user_cache.set(user_id, user)
     return user
 
+
+async def get_current_principal(credentials = Depends(auth_scheme)):
+    # for read-only endpoints that only need the caller's id. With
+    # TRUST_TOKEN_CLAIMS on, the signed token is trusted as-is, so a deleted
+    # user keeps read access until the token expires.
+    if not TRUST_TOKEN_CLAIMS:
+        return await get_current_user(credentials)
+
+    payload = _decode_credentials(credentials)
+    user_lookup_stats["claims_only"] += 1
+    return {
+        "_id": ObjectId(payload["id"]),
+        "email": payload["email"],
+        "username": payload.get("username"),
+    }
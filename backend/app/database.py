@@ -1,5 +1,5 @@
 import os
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,5 +8,5 @@ MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 # client = MongoClient("mongodb://localhost:27017/")
 # db = client["recipefinder"]
 
-client = MongoClient(MONGO_URI)
+client = AsyncMongoClient(MONGO_URI)
 db = client["recipefinder"]
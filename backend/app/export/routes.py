@@ -0,0 +1,58 @@
+import json
+import zlib
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.auth.utils import get_current_principal
+from app.database import db
+
+router = APIRouter()
+
+EXPORT_COLLECTIONS = ("saved_recipes", "my_recipes", "meal_plans")
+BATCH_SIZE = 500
+
+
+async def export_lines(user_id: str, collections: List[str]):
+    # one NDJSON line per document; cursors are read in batches so memory
+    # stays flat however large the library is
+    for name in collections:
+        cursor = db[name].find({"user_id": user_id}, batch_size=BATCH_SIZE)
+        async for doc in cursor:
+            doc["_id"] = str(doc["_id"])
+            yield (json.dumps({"collection": name, "doc": doc}, default=str) + "\n").encode()
+
+
+async def gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@router.get("/")
+async def export_library(
+    collections: Optional[str] = Query(None, description="Comma-separated subset of saved_recipes, my_recipes, meal_plans"),
+    gzip: bool = False,
+    user: dict = Depends(get_current_principal),
+):
+    user_id = str(user["_id"])
+
+    selected = list(EXPORT_COLLECTIONS)
+    if collections:
+        selected = [c.strip() for c in collections.split(",") if c.strip()]
+        unknown = set(selected) - set(EXPORT_COLLECTIONS)
+        if unknown:
+            raise HTTPException(400, f"Unknown collections: {', '.join(sorted(unknown))}")
+
+    body = export_lines(user_id, selected)
+    headers = {"Content-Disposition": 'attachment; filename="recipe-finder-export.ndjson"'}
+
+    if gzip:
+        headers["Content-Disposition"] = 'attachment; filename="recipe-finder-export.ndjson.gz"'
+        return StreamingResponse(gzip_stream(body), media_type="application/gzip", headers=headers)
+
+    return StreamingResponse(body, media_type="application/x-ndjson", headers=headers)
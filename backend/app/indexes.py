@@ -0,0 +1,170 @@
+"""
+Index bootstrap for every collection, run from the app lifespan.
+
+Also usable as an index advisor: explains each route's query shape and
+flags collection scans.
+
+    cd backend
+    python -m app.indexes               # create missing indexes
+    python -m app.indexes --report      # explain() query shapes, flag COLLSCANs
+    python -m app.indexes --duplicates  # list documents blocking a unique index
+"""
+import argparse
+import asyncio
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "saved_recipes": [
+        IndexModel([("user_id", ASCENDING), ("recipe_id", ASCENDING), ("source_type", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "meal_plans": [
+        IndexModel([("user_id", ASCENDING), ("date", ASCENDING), ("meal_type", ASCENDING)], unique=True),
+    ],
+    "recipe_reviews": [
+        IndexModel([("user_id", ASCENDING), ("recipe_id", ASCENDING), ("source_type", ASCENDING)], unique=True),
+        IndexModel([("recipe_id", ASCENDING), ("source_type", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "my_recipes": [
+        IndexModel([("user_id", ASCENDING)]),
+    ],
+    "spoonacular_recipes": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "search_index_changes": [
+        IndexModel([("at", ASCENDING)]),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "jobs": [
+        IndexModel([("status", ASCENDING), ("run_at", ASCENDING)]),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+}
+
+# (collection, filter, sort) for the queries the routers issue
+QUERY_SHAPES = [
+    ("users", {"email": "user@example.com"}, None),
+    ("saved_recipes", {"user_id": "u"}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ("saved_recipes", {"user_id": "u", "source_type": "spoonacular"}, None),
+    ("saved_recipes", {"user_id": "u", "recipe_id": "1"}, None),
+    ("meal_plans", {"user_id": "u", "date": {"$gte": "2024-01-01", "$lte": "2024-01-07"}}, [("date", ASCENDING)]),
+    ("meal_plans", {"user_id": "u", "date": "2024-01-01", "meal_type": "lunch"}, None),
+    ("recipe_reviews", {"recipe_id": "1", "source_type": "community"}, [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ("my_recipes", {"user_id": "u"}, None),
+]
+
+
+async def ensure_indexes():
+    # create_index is a no-op for indexes that already exist. Routes rely on
+    # the unique indexes (DuplicateKeyError) instead of checking first, so
+    # failing to build one aborts startup; other failures are only logged.
+    for name, models in INDEXES.items():
+        for model in models:
+            try:
+                await db[name].create_indexes([model])
+            except OperationFailure as exc:
+                if model.document.get("unique"):
+                    raise RuntimeError(
+                        f"could not create unique index {model.document['name']} on {name}: {exc}. "
+                        "Run `python -m app.indexes --duplicates` to find the conflicting documents."
+                    ) from exc
+                logger.warning("could not create index %s on %s: %s", model.document["name"], name, exc)
+
+    await verify_unique_indexes()
+
+
+def _key_spec(key) -> list:
+    # index_information() can report directions as floats (1.0)
+    return [(f, int(d) if isinstance(d, (int, float)) else d) for f, d in key]
+
+
+async def verify_unique_indexes():
+    # a same-keyed index built elsewhere without `unique` would let
+    # create_indexes pass while duplicates still go through; check the result
+    for name, models in INDEXES.items():
+        existing = await db[name].index_information()
+        for model in models:
+            if not model.document.get("unique"):
+                continue
+            key = _key_spec(model.document["key"].items())
+            if not any(info.get("unique") and _key_spec(info["key"]) == key for info in existing.values()):
+                raise RuntimeError(f"unique index on {name} {[k for k, _ in key]} is missing")
+
+
+async def duplicate_report() -> list:
+    # groups of documents that share the key of a unique index
+    report = []
+    for name, models in INDEXES.items():
+        for model in models:
+            if not model.document.get("unique"):
+                continue
+            fields = list(model.document["key"])
+            pipeline = [
+                {"$group": {"_id": {f: f"${f}" for f in fields}, "ids": {"$push": "$_id"}, "n": {"$sum": 1}}},
+                {"$match": {"n": {"$gt": 1}}},
+            ]
+            async for group in await db[name].aggregate(pipeline, allowDiskUse=True):
+                report.append({"collection": name, "key": group["_id"], "ids": [str(i) for i in group["ids"]]})
+    return report
+
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    if "inputStage" in plan:
+        yield from _stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+async def explain_report() -> list:
+    report = []
+    for name, query, sort in QUERY_SHAPES:
+        cursor = db[name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = (await cursor.explain())["queryPlanner"]["winningPlan"]
+        stages = [s for s in _stages(plan) if s]
+        report.append({
+            "collection": name,
+            "filter": query,
+            "sort": sort,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+    return report
+
+
+async def _main(report: bool, duplicates: bool):
+    if duplicates:
+        rows = await duplicate_report()
+        for row in rows:
+            print(f"{row['collection']:<15} {row['key']} -> {', '.join(row['ids'])}")
+        print(f"{len(rows)} duplicate group(s)")
+        return
+
+    if not report:
+        await ensure_indexes()
+        print("indexes ensured")
+        return
+
+    for row in await explain_report():
+        flag = "COLLSCAN" if row["collscan"] else "ok"
+        print(f"{flag:<9} {row['collection']:<15} {row['filter']} sort={row['sort']} -> {' <- '.join(row['stages'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--report", action="store_true", help="explain() each query shape and flag COLLSCANs")
+    parser.add_argument("--duplicates", action="store_true", help="list documents that block a unique index")
+    args = parser.parse_args()
+    asyncio.run(_main(args.report, args.duplicates))
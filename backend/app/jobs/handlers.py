@@ -0,0 +1,36 @@
+import logging
+
+from pymongo.errors import DuplicateKeyError
+
+from app.database import db
+from app.jobs.queue import job_queue
+from app.my_recipes.image_pipeline import mark_image_failed, process_recipe_image
+from app.recipes.warmer import warm_popular_recipes
+from app.reviews import stats
+
+logger = logging.getLogger(__name__)
+
+# Every job the app can run. Imported once from the lifespan so the registry
+# is complete before the queue starts (and before persisted jobs are requeued).
+# Delivery is at-least-once, so every handler must be safe to run twice.
+
+job_queue.register("recipe_image", on_failure=mark_image_failed)(process_recipe_image)
+job_queue.register("warm_popular_recipes")(warm_popular_recipes)
+
+
+@job_queue.register("rebuild_rating_stats")
+async def rebuild_rating_stats() -> dict:
+    return {"recipes": await stats.rebuild_stats()}
+
+
+async def enqueue_startup_jobs():
+    # backfill rating stats for reviews written before they were materialized;
+    # the fixed job id keeps concurrently starting processes from doubling it
+    if await stats.collection.estimated_document_count() or not await db.recipe_reviews.find_one({}, {"_id": 1}):
+        return
+    try:
+        await job_queue.enqueue("rebuild_rating_stats", max_attempts=3, job_id="rebuild_rating_stats:backfill")
+    except DuplicateKeyError:
+        pass
+    else:
+        logger.info("recipe_rating_stats is empty, rebuilding it from recipe_reviews")
@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+# In-process job queue. Jobs are persisted in the `jobs` collection and only
+# their ids travel through the asyncio queue; a worker claims a job with an
+# atomic find_one_and_update (status + lease), so a job already taken by
+# another worker or process is skipped. The lease is renewed while the job
+# runs. Failed jobs are retried with exponential backoff; on startup, and
+# every JOB_POLL_INTERVAL seconds, jobs that are due or whose lease expired
+# (the worker died) are requeued.
+#
+# Delivery is at-least-once: a worker that stalls past its lease, or dies
+# after the handler finished but before the job was marked done, lets another
+# worker run the job again. Handlers must be idempotent.
+#
+#   status: queued -> running -> done
+#                            \-> retrying -> running ... -> failed
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_BACKOFF_BASE = float(os.getenv("JOB_BACKOFF_BASE", "2"))
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", "300"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+# how often a running job extends its lease
+JOB_LEASE_RENEW_SECONDS = float(os.getenv("JOB_LEASE_RENEW_SECONDS", str(JOB_LEASE_SECONDS / 3)))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "30"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+Handler = Callable[..., Awaitable[Any]]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def backoff(attempt: int) -> float:
+    # full jitter: uniform in [0, base * 2^(attempt-1)], capped
+    return random.uniform(0, min(JOB_BACKOFF_MAX, JOB_BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+class JobQueue:
+
+    def __init__(self, collection, workers: int = JOB_WORKERS):
+        self.collection = collection
+        self.workers = workers
+        self._handlers: Dict[str, Handler] = {}
+        self._on_failure: Dict[str, Handler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+        self._timers: set = set()
+        self.counts = {"enqueued": 0, "done": 0, "retried": 0, "failed": 0}
+
+    # -- registry -----------------------------------------------------------
+
+    def register(self, name: str, on_failure: Optional[Handler] = None):
+        # decorator; `on_failure` is awaited with the job payload once all
+        # attempts are used up
+        def decorator(fn: Handler) -> Handler:
+            self._handlers[name] = fn
+            if on_failure is not None:
+                self._on_failure[name] = on_failure
+            return fn
+        return decorator
+
+    # -- lifecycle ----------------------------------------------------------
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        await self._requeue_due()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._poll()))
+
+    async def stop(self):
+        for timer in self._timers:
+            timer.cancel()
+        self._timers.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    # -- API ----------------------------------------------------------------
+
+    async def enqueue(
+        self,
+        name: str,
+        payload: Optional[dict] = None,
+        user_id: Optional[str] = None,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        delay: float = 0,
+        job_id: Optional[str] = None,
+    ) -> str:
+        # a caller-chosen `job_id` makes the enqueue idempotent: a second
+        # enqueue with the same id raises DuplicateKeyError
+        if name not in self._handlers:
+            raise ValueError(f"no handler registered for job '{name}'")
+
+        now = _now()
+        job = {
+            "_id": job_id or ObjectId(),
+            "name": name,
+            "payload": payload or {},
+            "user_id": user_id,
+            "status": "queued",
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "run_at": now + timedelta(seconds=delay),
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self.collection.insert_one(job)
+        self.counts["enqueued"] += 1
+        self._schedule(job["_id"], delay)
+        return str(job["_id"])
+
+    async def status(self, job_id: str, user_id: Optional[str] = None) -> Optional[dict]:
+        query = {"_id": ObjectId(job_id) if ObjectId.is_valid(job_id) else job_id}
+        if user_id is not None:
+            query["user_id"] = user_id
+        job = await self.collection.find_one(query, {"payload": 0, "lease_until": 0})
+        if job:
+            job["_id"] = str(job["_id"])
+        return job
+
+    def stats(self) -> dict:
+        return {
+            **self.counts,
+            "workers": self.workers if self._tasks else 0,
+            "queued_locally": self._queue.qsize() if self._queue else 0,
+            "handlers": sorted(self._handlers),
+        }
+
+    # -- internals ----------------------------------------------------------
+
+    def _schedule(self, job_id: ObjectId, delay: float):
+        # jobs enqueued before start() (or in another process) are picked up
+        # by the startup requeue / poller instead
+        if self._queue is None:
+            return
+        if delay <= 0:
+            self._queue.put_nowait(job_id)
+            return
+
+        def fire():
+            self._timers.discard(timer)
+            if self._queue is not None:
+                self._queue.put_nowait(job_id)
+
+        timer = asyncio.get_running_loop().call_later(delay, fire)
+        self._timers.add(timer)
+
+    def _claimable(self, now: datetime) -> dict:
+        return {"$or": [
+            {"status": {"$in": ["queued", "retrying"]}, "run_at": {"$lte": now}},
+            {"status": "running", "lease_until": {"$lt": now}},
+        ]}
+
+    async def _requeue_due(self):
+        now = _now()
+        async for job in self.collection.find({**self._claimable(now), "name": {"$in": list(self._handlers)}}, {"_id": 1}):
+            self._queue.put_nowait(job["_id"])
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            try:
+                if self._queue.empty():
+                    await self._requeue_due()
+            except Exception:
+                logger.exception("job poll failed")
+
+    async def _claim(self, job_id: ObjectId) -> Optional[dict]:
+        now = _now()
+        return await self.collection.find_one_and_update(
+            {"_id": job_id, **self._claimable(now)},
+            {
+                "$set": {"status": "running", "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS), "updated_at": now},
+                "$inc": {"attempts": 1},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _renew_lease(self, job: dict):
+        # matches on `attempts` so a worker whose job was reclaimed elsewhere
+        # stops renewing instead of extending the new owner's lease
+        while True:
+            await asyncio.sleep(JOB_LEASE_RENEW_SECONDS)
+            now = _now()
+            try:
+                result = await self.collection.update_one(
+                    {"_id": job["_id"], "status": "running", "attempts": job["attempts"]},
+                    {"$set": {"lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS), "updated_at": now}},
+                )
+            except Exception:
+                logger.exception("lease renewal for job %s failed", job["_id"])
+                continue
+            if not result.matched_count:
+                logger.warning("job %s (%s) lost its lease", job["_id"], job["name"])
+                return
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await self._claim(job_id)
+                if job is not None:
+                    await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("job worker error for %s", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: dict):
+        handler = self._handlers.get(job["name"])
+        renewer = asyncio.create_task(self._renew_lease(job))
+        try:
+            if handler is None:
+                raise LookupError(f"no handler registered for job '{job['name']}'")
+            result = await handler(**job["payload"])
+        except asyncio.CancelledError:
+            # shutting down: leave the job for the lease to expire and requeue it
+            raise
+        except Exception as exc:
+            await self._failed(job, exc)
+            return
+        finally:
+            renewer.cancel()
+
+        now = _now()
+        await self.collection.update_one(
+            {"_id": job["_id"]},
+            {
+                "$set": {
+                    "status": "done",
+                    "result": result if isinstance(result, dict) else None,
+                    "finished_at": now,
+                    "updated_at": now,
+                    "expires_at": now + timedelta(seconds=JOB_RETENTION_SECONDS),
+                },
+                # payloads can hold large blobs (image uploads); drop them once done
+                "$unset": {"payload": "", "lease_until": "", "error": ""},
+            },
+        )
+        self.counts["done"] += 1
+
+    async def _failed(self, job: dict, exc: Exception):
+        now = _now()
+        error = f"{type(exc).__name__}: {exc}"
+
+        if job["attempts"] < job["max_attempts"]:
+            delay = backoff(job["attempts"])
+            logger.warning("job %s (%s) attempt %d failed, retrying in %.1fs: %s",
+                           job["_id"], job["name"], job["attempts"], delay, error)
+            await self.collection.update_one(
+                {"_id": job["_id"]},
+                {"$set": {"status": "retrying", "error": error, "run_at": now + timedelta(seconds=delay), "updated_at": now},
+                 "$unset": {"lease_until": ""}},
+            )
+            self.counts["retried"] += 1
+            self._schedule(job["_id"], delay)
+            return
+
+        logger.error("job %s (%s) failed after %d attempts: %s", job["_id"], job["name"], job["attempts"], error)
+        on_failure = self._on_failure.get(job["name"])
+        if on_failure is not None:
+            try:
+                await on_failure(**job["payload"])
+            except Exception:
+                logger.exception("on_failure hook for job %s failed", job["_id"])
+        await self.collection.update_one(
+            {"_id": job["_id"]},
+            {"$set": {
+                "status": "failed",
+                "error": error,
+                "finished_at": now,
+                "updated_at": now,
+                "expires_at": now + timedelta(seconds=JOB_RETENTION_SECONDS),
+            }, "$unset": {"payload": "", "lease_until": ""}},
+        )
+        self.counts["failed"] += 1
+
+
+job_queue = JobQueue(db.jobs)
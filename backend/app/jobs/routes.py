@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.auth.utils import get_current_principal
+from app.jobs.queue import job_queue
+
+router = APIRouter()
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, user: dict = Depends(get_current_principal)):
+    # callers only see jobs they enqueued
+    job = await job_queue.status(job_id, user_id=str(user["_id"]))
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job
@@ -1,13 +1,51 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 
 from app.auth.routes import router as auth_router
 from app.users.routes import router as users_router
-from app.recipes.routes import router as recipes_router
+from app.recipes.routes import router as recipes_router, search_cache, upstream_flight
 from app.my_recipes.routes import router as my_recipes_router
 from app.meal.routes import router as meal_router
+from app.export.routes import router as export_router
+from app.reviews.routes import router as reviews_router
+from app.jobs.routes import router as jobs_router
+from app import database
+from app.auth.utils import hash_pool_stats, shutdown_hash_executor, user_cache, user_lookup_stats
+from app.indexes import ensure_indexes
+from app.jobs import handlers  # registers the job handlers
+from app.jobs.queue import job_queue
+from app.recipes import warmer
+from app.utils.images import shutdown_image_executor
+from app.search import sync as search_sync
+from app.utils import spoonacular, storage
+from app.utils.breaker import breaker
+from app.utils.quota import quota
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await spoonacular.start_client()
+    await ensure_indexes()
+    await search_sync.load()
+    search_sync.start()
+    await job_queue.start()
+    await handlers.enqueue_startup_jobs()
+    warmer.start_scheduler()
+    yield
+    await warmer.stop_scheduler()
+    await search_sync.stop()
+    await job_queue.stop()
+    await spoonacular.close_client()
+    await database.client.close()
+    shutdown_hash_executor()
+    shutdown_image_executor()
 
-app = FastAPI(title="Recipe Finder - Backend API")
+
+app = FastAPI(title="Recipe Finder - Backend API", lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",
@@ -31,6 +69,30 @@ app.include_router(my_recipes_router, prefix="/api/my-recipes", tags=["my-recipe
 
 app.include_router(meal_router, prefix="/api/meal", tags=["meal-planner"])
 
+app.include_router(export_router, prefix="/api/export", tags=["export"])
+
+app.include_router(reviews_router, prefix="/api/reviews", tags=["reviews"])
+
+app.include_router(jobs_router, prefix="/api/jobs", tags=["jobs"])
+
+# the local image backend (IMAGE_STORAGE=local) is served by the app itself;
+# an absolute IMAGE_BASE_URL means something else serves the directory
+if storage.STORAGE_BACKEND == "local" and storage.LOCAL_BASE_URL.startswith("/"):
+    os.makedirs(storage.LOCAL_STORAGE_DIR, exist_ok=True)
+    app.mount(storage.LOCAL_BASE_URL.rstrip("/"), StaticFiles(directory=storage.LOCAL_STORAGE_DIR), name="media")
+
 @app.get("/")
 def read_root():
-    return {"status": "ok", "msg" : "Recipe Finder Backend API is running."}
\ No newline at end of file
+    return {"status": "ok", "msg" : "Recipe Finder Backend API is running."}
+
+@app.get("/metrics")
+def read_metrics():
+    return {
+        "search_cache": search_cache.stats(),
+        "spoonacular_quota": quota.stats(),
+        "spoonacular_breaker": {**breaker.stats(), **spoonacular.hedge_stats},
+        "upstream_singleflight": upstream_flight.stats(),
+        "auth_user_lookups": {**user_lookup_stats, "cache": user_cache.stats()},
+        "password_hashing": hash_pool_stats(),
+        "jobs": job_queue.stats(),
+    }
@@ -0,0 +1,111 @@
+import asyncio
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+from bson import ObjectId
+
+from app.database import db
+from app.recipes import detail_cache
+
+NUTRIENTS = {"calories": "calories", "protein": "protein", "fat": "fat", "carbohydrates": "carbs"}
+
+
+def span_range(anchor: date, span: str) -> Tuple[date, date]:
+    if span == "month":
+        start = anchor.replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        return start, next_month - timedelta(days=1)
+    start = anchor - timedelta(days=anchor.weekday())
+    return start, start + timedelta(days=6)
+
+
+def _spoonacular_summary(recipe: dict) -> dict:
+    summary = {
+        "title": recipe.get("title"),
+        "image": recipe.get("image"),
+        "readyInMinutes": recipe.get("readyInMinutes"),
+        "ingredients": recipe.get("ingredients", []),
+    }
+    for n in recipe.get("nutrition", []):
+        key = NUTRIENTS.get((n.get("name") or "").lower())
+        if key:
+            summary[key] = n.get("amount")
+    return summary
+
+
+def _community_summary(doc: dict) -> dict:
+    return {
+        "title": doc.get("title"),
+        "image": doc.get("image"),
+        "readyInMinutes": doc.get("readyInMinutes"),
+        "calories": doc.get("calories"),
+        "ingredients": doc.get("ingredients", []),
+    }
+
+
+async def load_plan_recipes(meals: List[dict]) -> Dict[Tuple[str, str], dict]:
+    # one $in read per source for every recipe referenced by `meals`. Spoonacular
+    # recipes come from the detail cache only; uncached ones are left out.
+    community_ids = {m["source_id"] for m in meals if m.get("source_type") == "community" and ObjectId.is_valid(m["source_id"])}
+    spoonacular_ids = list({m["source_id"] for m in meals if m.get("source_type") == "spoonacular"})
+
+    async def community():
+        if not community_ids:
+            return {}
+        cursor = db.my_recipes.find({"_id": {"$in": [ObjectId(i) for i in community_ids]}})
+        return {str(doc["_id"]): _community_summary(doc) async for doc in cursor}
+
+    async def spoonacular():
+        if not spoonacular_ids:
+            return {}
+        found = {rid: doc["recipe"] for rid, doc in (await detail_cache.get_many(spoonacular_ids)).items()}
+        return {rid: _spoonacular_summary(r) for rid, r in found.items()}
+
+    community_map, spoonacular_map = await asyncio.gather(community(), spoonacular())
+
+    recipes = {("community", rid): r for rid, r in community_map.items()}
+    recipes.update({("spoonacular", rid): r for rid, r in spoonacular_map.items()})
+    return recipes
+
+
+def _add_totals(totals: dict, recipe: dict):
+    for key in NUTRIENTS.values():
+        value = recipe.get(key)
+        if value is not None:
+            totals[key] = round(totals.get(key, 0) + value, 2)
+
+
+def build_view(meals: List[dict], recipes: Dict[Tuple[str, str], dict], start: date, end: date) -> dict:
+    days = {}
+    day = start
+    while day <= end:
+        days[day.isoformat()] = {"date": day.isoformat(), "meals": [], "totals": {}, "by_meal_type": defaultdict(dict)}
+        day += timedelta(days=1)
+
+    totals: dict = {}
+    by_meal_type: Dict[str, dict] = defaultdict(dict)
+
+    for meal in meals:
+        entry = days.get(meal["date"])
+        if entry is None:
+            continue
+
+        recipe = recipes.get((meal["source_type"], meal["source_id"]))
+        details = None
+        if recipe:
+            details = {k: v for k, v in recipe.items() if k != "ingredients"}
+            _add_totals(entry["totals"], recipe)
+            _add_totals(entry["by_meal_type"][meal["meal_type"]], recipe)
+            _add_totals(totals, recipe)
+            _add_totals(by_meal_type[meal["meal_type"]], recipe)
+
+        entry["meals"].append({**meal, "recipe": details})
+
+    return {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "days": [{**d, "by_meal_type": dict(d["by_meal_type"])} for d in days.values()],
+        "totals": totals,
+        "by_meal_type": dict(by_meal_type),
+    }
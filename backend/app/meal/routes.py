@@ -1,10 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from app.database import db
-from app.auth.utils import get_current_user
+from app.auth.utils import get_current_principal, get_current_user
 from pydantic import BaseModel, Field
 from typing import Optional, List
+import os
 import time
+from datetime import date, timedelta
 from bson import ObjectId
+from pymongo import InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.meal.planner import build_view, load_plan_recipes, span_range
+from app.meal.shopping import build_shopping_list
 
 class MealPlanIn(BaseModel):
     source_id: str
@@ -21,6 +27,36 @@ class MealPlanUpdate(BaseModel):
     date: Optional[str] = None
     meal_type: Optional[str] = None
 
+MAX_BULK_ITEMS = int(os.getenv("MEAL_PLAN_MAX_BULK_ITEMS", "500"))
+MAX_TEMPLATE_DAYS = int(os.getenv("MEAL_PLAN_MAX_TEMPLATE_DAYS", "366"))
+
+class MealPlanBulkIn(BaseModel):
+    items: List[MealPlanIn] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+    overwrite: bool = False
+
+class MealPlanBulkDeleteIn(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+class MealPlanCopyIn(BaseModel):
+    from_start: str = Field(..., description="First date to copy (YYYY-MM-DD)")
+    from_end: str = Field(..., description="Last date to copy (YYYY-MM-DD)")
+    to_start: str = Field(..., description="Date the copied range starts on (YYYY-MM-DD)")
+    overwrite: bool = False
+
+class MealTemplateItem(BaseModel):
+    weekday: Optional[int] = Field(None, ge=0, le=6, description="0 = Monday; omit to repeat every day")
+    meal_type: str
+    source_id: str
+    source_type: str = Field(..., pattern="^(spoonacular|community)$")
+    title: str
+    image: Optional[str] = None
+
+class MealTemplateIn(BaseModel):
+    start_date: str
+    end_date: str
+    template: List[MealTemplateItem] = Field(..., min_length=1, max_length=100)
+    overwrite: bool = False
+
 router = APIRouter()
 
 @router.post("/", response_model=MealPlanOut, status_code=status.HTTP_201_CREATED)
@@ -34,29 +70,21 @@ async def create_meal_plan(
     meal_doc["user_id"] = user_id
     meal_doc["created_at"] = int(time.time())
 
-    if db.meal_plans.find_one({
-        "user_id": user_id,
-        "date": payload.date,
-        "meal_type": payload.meal_type
-    }):
+    # the unique {user_id, date, meal_type} index guards the slot
+    try:
+        result = await db.meal_plans.insert_one(meal_doc)
+    except DuplicateKeyError:
         raise HTTPException(status_code=400,detail="Meal slot Already booked for this date and time")
-    
-    result = db.meal_plans.insert_one(meal_doc)
 
-    created_meal = db.meal_plans.find_one({"_id": result.inserted_id})
+    meal_doc["_id"] = str(result.inserted_id)
 
-    if not created_meal:
-        raise HTTPException(status_code=500, detail="Failed to retrieve created meal")
-    
-    created_meal["_id"] = str(created_meal["_id"])
-    
-    return created_meal
+    return meal_doc
 
 @router.get("/", response_model=List[MealPlanOut])
 async def get_meal_plan(
     start_date: str = Query(..., description="Start Date (YYYY-MM-DD)"),
     end_date: str = Query(..., description="End Date (YYYY-MM-DD)"),
-    user: dict = Depends(get_current_user)
+    user: dict = Depends(get_current_principal)
 ):
     user_id = str(user["_id"])
 
@@ -67,8 +95,7 @@ async def get_meal_plan(
             "$lte": end_date
         }
     }
-    meal_plans = db.meal_plans.find(query).sort("date", 1)
-    meal_plan = list(meal_plans)
+    meal_plan = await db.meal_plans.find(query).sort("date", 1).to_list()
 
     for meal in meal_plan:
         if meal.get("_id"):
@@ -76,6 +103,211 @@ async def get_meal_plan(
 
     return meal_plan
 
+def _parse_date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+async def _bulk_upsert_meals(user_id: str, docs: List[dict], overwrite: bool) -> List[dict]:
+    # one unordered bulk_write; slot conflicts come back per item from the
+    # unique {user_id, date, meal_type} index instead of a find_one per slot
+    if len(docs) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} meals per request")
+
+    now = int(time.time())
+    ops = []
+    for doc in docs:
+        doc.update({"_id": ObjectId(), "user_id": user_id, "created_at": now})
+        if overwrite:
+            slot = {"user_id": user_id, "date": doc["date"], "meal_type": doc["meal_type"]}
+            ops.append(ReplaceOne(slot, {k: v for k, v in doc.items() if k != "_id"}, upsert=True))
+        else:
+            ops.append(InsertOne(doc))
+
+    errors = {}
+    upserted = {}
+    if ops:
+        try:
+            result = await db.meal_plans.bulk_write(ops, ordered=False)
+            upserted = result.upserted_ids
+        except BulkWriteError as exc:
+            errors = {e["index"]: e for e in exc.details.get("writeErrors", [])}
+            upserted = {u["index"]: u["_id"] for u in exc.details.get("upserted", [])}
+
+    ids = {i: doc["_id"] for i, doc in enumerate(docs)} if not overwrite else dict(upserted)
+    replaced = [i for i in range(len(docs)) if i not in errors and i not in ids]
+    if replaced:
+        # slots that already existed keep their _id; read them back in one query
+        dates = list({docs[i]["date"] for i in replaced})
+        existing = {
+            (row["date"], row["meal_type"]): row["_id"]
+            async for row in db.meal_plans.find(
+                {"user_id": user_id, "date": {"$in": dates}}, {"date": 1, "meal_type": 1}
+            )
+        }
+        for i in replaced:
+            ids[i] = existing.get((docs[i]["date"], docs[i]["meal_type"]))
+
+    results = []
+    for i, doc in enumerate(docs):
+        item = {"index": i, "date": doc["date"], "meal_type": doc["meal_type"]}
+        error = errors.get(i)
+        if error is None:
+            item["status"] = "saved" if overwrite else "created"
+            item["_id"] = str(ids[i]) if ids.get(i) is not None else None
+        elif error.get("code") == 11000:
+            item["status"] = "conflict"
+            item["detail"] = "Meal slot Already booked for this date and time"
+        else:
+            item["status"] = "error"
+            item["detail"] = error.get("errmsg")
+        results.append(item)
+    return results
+
+
+@router.post("/bulk")
+async def bulk_create_meal_plans(
+    payload: MealPlanBulkIn,
+    user: dict = Depends(get_current_user)
+):
+    docs = [item.model_dump() for item in payload.items]
+    return {"results": await _bulk_upsert_meals(str(user["_id"]), docs, payload.overwrite)}
+
+
+@router.post("/bulk-delete")
+async def bulk_delete_meal_plans(
+    payload: MealPlanBulkDeleteIn,
+    user: dict = Depends(get_current_user)
+):
+    user_id = str(user["_id"])
+    valid = [ObjectId(i) for i in payload.ids if ObjectId.is_valid(i)]
+
+    owned = {
+        str(doc["_id"])
+        async for doc in db.meal_plans.find({"_id": {"$in": valid}, "user_id": user_id}, {"_id": 1})
+    }
+    if owned:
+        await db.meal_plans.delete_many({"_id": {"$in": [ObjectId(i) for i in owned]}, "user_id": user_id})
+
+    return {"results": [
+        {"_id": i, "status": "deleted" if i in owned else ("not_found" if ObjectId.is_valid(i) else "invalid_id")}
+        for i in payload.ids
+    ]}
+
+
+@router.post("/copy")
+async def copy_meal_plans(
+    payload: MealPlanCopyIn,
+    user: dict = Depends(get_current_user)
+):
+    user_id = str(user["_id"])
+    from_start, from_end, to_start = _parse_date(payload.from_start), _parse_date(payload.from_end), _parse_date(payload.to_start)
+    if from_end < from_start:
+        raise HTTPException(status_code=400, detail="from_end is before from_start")
+
+    shift = to_start - from_start
+    source = db.meal_plans.find(
+        {"user_id": user_id, "date": {"$gte": from_start.isoformat(), "$lte": from_end.isoformat()}},
+        {"_id": 0, "user_id": 0, "created_at": 0},
+    ).limit(MAX_BULK_ITEMS + 1)
+    docs = []
+    async for meal in source:
+        try:
+            meal["date"] = (date.fromisoformat(meal["date"]) + shift).isoformat()
+        except OverflowError:
+            raise HTTPException(status_code=400, detail="to_start moves meals out of the supported date range")
+        docs.append(meal)
+
+    return {"results": await _bulk_upsert_meals(user_id, docs, payload.overwrite)}
+
+
+@router.post("/template")
+async def apply_meal_template(
+    payload: MealTemplateIn,
+    user: dict = Depends(get_current_user)
+):
+    start, end = _parse_date(payload.start_date), _parse_date(payload.end_date)
+    if end < start:
+        raise HTTPException(status_code=400, detail="end_date is before start_date")
+    if (end - start).days + 1 > MAX_TEMPLATE_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_TEMPLATE_DAYS} days per template")
+
+    docs = []
+    day = start
+    while day <= end:
+        for item in payload.template:
+            if item.weekday is None or item.weekday == day.weekday():
+                docs.append({**item.model_dump(exclude={"weekday"}), "date": day.isoformat()})
+                if len(docs) > MAX_BULK_ITEMS:
+                    raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} meals per request")
+        day += timedelta(days=1)
+
+    return {"results": await _bulk_upsert_meals(str(user["_id"]), docs, payload.overwrite)}
+
+
+@router.get("/view")
+async def get_meal_plan_view(
+    date_: str = Query(..., alias="date", description="Any date in the week/month (YYYY-MM-DD)"),
+    span: str = Query("week", pattern="^(week|month)$"),
+    user: dict = Depends(get_current_principal)
+):
+    # meals with their recipe data embedded and per-day / per-slot nutrition totals
+    user_id = str(user["_id"])
+
+    try:
+        anchor = date.fromisoformat(date_)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format, expected YYYY-MM-DD")
+
+    start, end = span_range(anchor, span)
+    meals = await db.meal_plans.find({
+        "user_id": user_id,
+        "date": {"$gte": start.isoformat(), "$lte": end.isoformat()}
+    }).sort("date", 1).to_list()
+
+    for meal in meals:
+        meal["_id"] = str(meal["_id"])
+
+    recipes = await load_plan_recipes(meals)
+    return build_view(meals, recipes, start, end)
+
+@router.get("/shopping-list")
+async def get_shopping_list(
+    start_date: str = Query(..., description="First date (YYYY-MM-DD)"),
+    end_date: str = Query(..., description="Last date (YYYY-MM-DD)"),
+    user: dict = Depends(get_current_principal)
+):
+    # consolidated ingredients for every meal planned in the range; Spoonacular
+    # recipes are read from the detail cache only, uncached ones are listed in `missing`
+    user_id = str(user["_id"])
+    start, end = _parse_date(start_date), _parse_date(end_date)
+    if end < start:
+        raise HTTPException(status_code=400, detail="end_date is before start_date")
+
+    meals = await db.meal_plans.find(
+        {"user_id": user_id, "date": {"$gte": start.isoformat(), "$lte": end.isoformat()}},
+        {"source_id": 1, "source_type": 1, "title": 1},
+    ).to_list()
+
+    recipes = await load_plan_recipes(meals)
+    uses, missing = [], []
+    for meal in meals:
+        recipe = recipes.get((meal["source_type"], meal["source_id"]))
+        if recipe is None:
+            missing.append({"source_id": meal["source_id"], "source_type": meal["source_type"], "title": meal.get("title")})
+        else:
+            uses.append(recipe)
+
+    return {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "meals": len(meals),
+        **build_shopping_list(uses),
+        "missing": missing,
+    }
+
 @router.delete("/{meal_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_meal_plan(
     meal_id: str,
@@ -86,7 +318,7 @@ async def delete_meal_plan(
     if not ObjectId.is_valid(meal_id):
         raise HTTPException(status_code=400, detail="Invalid meal Format ID")
     
-    result = db.meal_plans.delete_one({
+    result = await db.meal_plans.delete_one({
         "_id": ObjectId(meal_id),
         "user_id": user_id
     })
@@ -112,18 +344,22 @@ async def update_meal_plan(
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields provided")
     
-    result = db.meal_plans.update_one(
-        {
-            "_id": ObjectId(meal_id),
-            "user_id": user_id
-        },
-        {"$set": update_data}
-    )
+    # moving into an occupied slot trips the unique {user_id, date, meal_type} index
+    try:
+        result = await db.meal_plans.update_one(
+            {
+                "_id": ObjectId(meal_id),
+                "user_id": user_id
+            },
+            {"$set": update_data}
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Meal slot Already booked for this date and time")
     if result.modified_count == 0:
-        if db.meal_plans.find_one({"_id": ObjectId(meal_id)}):
+        if await db.meal_plans.find_one({"_id": ObjectId(meal_id)}):
             raise HTTPException(status_code=400, detail="Meal entry found but no new data provided")
         else:
             raise HTTPException(status_code=404, detail="Meal plan entry not found")
         
-    updated_meal = db.meal_plans.find_one({"_id": ObjectId(meal_id)})
+    updated_meal = await db.meal_plans.find_one({"_id": ObjectId(meal_id)})
     return updated_meal
@@ -0,0 +1,118 @@
+import re
+from fractions import Fraction
+from typing import Dict, List, Optional, Tuple
+
+from app.search.ingredients import normalize_ingredient
+
+# Shopping-list aggregation for a meal-plan range. Each ingredient line is
+# converted to its dimension's base unit and added to a running total per
+# (ingredient, dimension, unit) key.
+
+# unit -> (dimension, factor to the base unit: g for mass, ml for volume)
+UNITS: Dict[str, Tuple[str, float]] = {}
+for _names, _dim, _factor in [
+    (("g", "gram", "grams", "gr", "gs"), "mass", 1.0),
+    (("kg", "kilogram", "kilograms", "kgs"), "mass", 1000.0),
+    (("mg", "milligram", "milligrams"), "mass", 0.001),
+    (("oz", "ounce", "ounces"), "mass", 28.3495),
+    (("lb", "lbs", "pound", "pounds"), "mass", 453.592),
+    (("ml", "milliliter", "milliliters", "millilitre", "millilitres"), "volume", 1.0),
+    (("l", "liter", "liters", "litre", "litres"), "volume", 1000.0),
+    (("cup", "cups", "c"), "volume", 240.0),
+    (("tbsp", "tbsps", "tablespoon", "tablespoons", "tbs", "tb", "T"), "volume", 15.0),
+    (("tsp", "tsps", "teaspoon", "teaspoons", "t"), "volume", 5.0),
+    (("fl oz", "fluid ounce", "fluid ounces"), "volume", 29.5735),
+    (("pint", "pints", "pt"), "volume", 473.176),
+]:
+    for _name in _names:
+        UNITS[_name] = (_dim, _factor)
+
+_AMOUNT_RE = re.compile(r"^\s*(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)\s*(?:-\s*[\d./]+\s*)?(.*)$")
+_UNICODE_FRACTIONS = {"½": "1/2", "⅓": "1/3", "⅔": "2/3", "¼": "1/4", "¾": "3/4", "⅛": "1/8"}
+
+
+def _to_number(text: str) -> float:
+    parts = text.split()
+    return float(sum(Fraction(p) for p in parts))
+
+
+def parse_amount(amount, unit: Optional[str] = None) -> Optional[Tuple[float, str]]:
+    # (quantity, unit) from a Spoonacular numeric amount + unit, or from a
+    # free-text community amount like "1 1/2 cups" or "200g"
+    if isinstance(amount, (int, float)):
+        return float(amount), (unit or "").strip()
+    if not amount:
+        return None
+
+    text = str(amount)
+    for symbol, fraction in _UNICODE_FRACTIONS.items():
+        text = text.replace(symbol, f" {fraction}")
+    match = _AMOUNT_RE.match(text)
+    if not match:
+        return None
+    if unit is None:
+        rest = match.group(2).split()
+        unit = rest[0] if rest else ""
+    try:
+        quantity = _to_number(match.group(1))
+    except (ZeroDivisionError, ValueError):
+        # e.g. "1/0 cup"; the caller lists the line as unparsed
+        return None
+    return quantity, unit.strip()
+
+
+def _dimension(unit: str) -> Tuple[str, float]:
+    found = UNITS.get(unit) or UNITS.get(unit.lower().rstrip("."))
+    if found:
+        return found
+    return "count", 1.0
+
+
+def _display(dimension: str, total: float, unit: str) -> dict:
+    if dimension == "mass":
+        return {"amount": round(total / 1000, 3), "unit": "kg"} if total >= 1000 else {"amount": round(total, 1), "unit": "g"}
+    if dimension == "volume":
+        return {"amount": round(total / 1000, 3), "unit": "l"} if total >= 1000 else {"amount": round(total, 1), "unit": "ml"}
+    return {"amount": round(total, 2), "unit": unit}
+
+
+def build_shopping_list(recipe_uses: List[dict]) -> dict:
+    # recipe_uses: one entry per planned meal, each with an "ingredients" list
+    totals: Dict[Tuple[str, str, str], float] = {}
+    recipe_counts: Dict[str, set] = {}
+    unparsed: Dict[str, List[str]] = {}
+    normalized: Dict[str, str] = {}
+
+    for use_index, recipe in enumerate(recipe_uses):
+        for ing in recipe.get("ingredients") or []:
+            raw_name = ing.get("name") if isinstance(ing, dict) else ing
+            name = normalized.get(raw_name)
+            if name is None:
+                name = normalized[raw_name] = normalize_ingredient(raw_name)
+            if not name:
+                continue
+            recipe_counts.setdefault(name, set()).add(use_index)
+
+            parsed = parse_amount(ing.get("amount"), ing.get("unit")) if isinstance(ing, dict) else None
+            if parsed is None:
+                if isinstance(ing, dict) and ing.get("amount"):
+                    unparsed.setdefault(name, []).append(str(ing["amount"]))
+                continue
+
+            quantity, unit = parsed
+            dimension, factor = _dimension(unit)
+            # count-like units ("clove", "can", "") are only summed with the same unit
+            key = (name, dimension, unit.lower() if dimension == "count" else "")
+            totals[key] = totals.get(key, 0.0) + quantity * factor
+
+    items: Dict[str, dict] = {}
+    for (name, dimension, unit), total in totals.items():
+        item = items.setdefault(name, {"name": name, "quantities": []})
+        item["quantities"].append(_display(dimension, total, unit))
+    for name, uses in recipe_counts.items():
+        item = items.setdefault(name, {"name": name, "quantities": []})
+        item["recipes"] = len(uses)
+        if name in unparsed:
+            item["unparsed"] = unparsed[name]
+
+    return {"items": sorted(items.values(), key=lambda i: i["name"]), "total_items": len(items)}
@@ -0,0 +1,48 @@
+import logging
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.database import db
+from app.search.sync import index_recipe
+from app.utils.images import build_variants, primary_url, variant_key
+from app.utils.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# A recipe saved with an image gets image_status="pending" and an image_token;
+# the "recipe_image" job (process_recipe_image) then builds the variants,
+# stores them and fills in `image` / `images`. Writes are conditional on the
+# token, so a slow job for an older upload can't overwrite a newer one.
+# Variant keys are fixed per token and storage overwrites them, so the job
+# can safely run again after a lost lease.
+
+
+def new_image_token() -> str:
+    return str(ObjectId())
+
+
+async def process_recipe_image(recipe_id: str, token: str, data: bytes) -> dict:
+    # raises on failure so the job queue retries it
+    variants = await build_variants(data)
+    storage = get_storage()
+    urls = {}
+    for name, content in variants.items():
+        urls[name] = await storage.save(variant_key(f"recipes/{recipe_id}/{token}", name), content)
+
+    updated = await db.my_recipes.find_one_and_update(
+        {"_id": ObjectId(recipe_id), "image_token": token},
+        {"$set": {"image": primary_url(urls), "images": urls, "image_status": "ready"}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if updated:
+        await index_recipe(updated)
+    return {"images": urls, "applied": updated is not None}
+
+
+async def mark_image_failed(recipe_id: str, token: str, data: bytes = None):
+    logger.error("giving up on image for recipe %s", recipe_id)
+    await db.my_recipes.update_one(
+        {"_id": ObjectId(recipe_id), "image_token": token},
+        {"$set": {"image_status": "failed"}},
+    )
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi import File, UploadFile, Form
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from bson import ObjectId
 from app.database import db
-from app.auth.utils import get_current_user
-from app.utils.cloudinary import upload_image
+from app.auth.utils import get_current_principal, get_current_user
+from app.utils.images import read_upload
+from app.my_recipes.image_pipeline import new_image_token
+from app.jobs.queue import job_queue
+from app.utils.pagination import cached_count, invalidate_count, keyset_page
+from app.search.index import READY_BUCKETS, CALORIE_RANGES, community_index
+from app.search.ingredients import ingredient_index
+from app.search.sync import index_recipe, unindex_recipe
 import json
 
 router = APIRouter()
@@ -32,6 +38,14 @@ class MyRecipeIn(BaseModel):
 
 class MyRecipeOut(MyRecipeIn):
     recipe_id: str
+    image_status: Optional[str] = None
+    images: Optional[Dict[str, str]] = None
+
+class PantryIn(BaseModel):
+    ingredients: List[str] = Field(..., min_length=1, max_length=100)
+    limit: int = Field(20, ge=1, le=100)
+    min_coverage: float = Field(0.0, ge=0.0, le=1.0)
+    max_missing: Optional[int] = Field(None, ge=0)
 
 
 def serialize_recipe(doc):
@@ -45,6 +59,8 @@ def serialize_recipe(doc):
         "ingredients": doc.get("ingredients", []),
         "steps": doc.get("steps", []),
         "image": doc.get("image"),
+        "image_status": doc.get("image_status"),
+        "images": doc.get("images"),
         "source_type": doc["source_type"],
     }
 
@@ -69,10 +85,9 @@ async def create_recipe(
     except:
         raise HTTPException(400, "Invalid JSON for ingredients or steps")
 
-    image_url = None
-    if image:
-        contents = await image.read()
-        image_url = upload_image(contents)
+    # the image is processed and uploaded by a "recipe_image" job; the
+    # recipe starts with image_status="pending"
+    contents = await read_upload(image) if image else None
 
     recipe = {
         "user_id": user_id,
@@ -82,12 +97,23 @@ async def create_recipe(
         "calories": calories,
         "ingredients": ingredients_data,
         "steps": steps_data,
-        "image": image_url,
+        "image": None,
         "source_type":source_type,
     }
+    if contents:
+        recipe.update({"image_status": "pending", "image_token": new_image_token()})
 
-    result = db.my_recipes.insert_one(recipe)
+    result = await db.my_recipes.insert_one(recipe)
     recipe["_id"] = result.inserted_id
+    invalidate_count(db.my_recipes, {})
+    await index_recipe(recipe)
+
+    if contents:
+        await job_queue.enqueue(
+            "recipe_image",
+            {"recipe_id": str(result.inserted_id), "token": recipe["image_token"], "data": contents},
+            user_id=user_id,
+        )
 
     return serialize_recipe(recipe)
 
@@ -96,14 +122,27 @@ async def create_recipe(
 async def get_all_recipes(
     page: int = 1,
     per_page: int = 12,
-    user: dict = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    user: dict = Depends(get_current_principal)
 ):
+    # pass `cursor` (empty for the first page) for keyset pagination, newest first
     collection = db.my_recipes
 
-    total = collection.count_documents({})
+    total = await cached_count(collection, {}) if include_total else None
+
+    if cursor is not None:
+        docs, next_cursor = await keyset_page(collection, {}, "_id", cursor, per_page)
+        return {
+            "results": [serialize_recipe(d) for d in docs],
+            "total_results": total,
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+        }
+
     skip = (page - 1) * per_page
 
-    docs = list(collection.find().skip(skip).limit(per_page))
+    docs = await collection.find().skip(skip).limit(per_page).to_list()
     serialized = [serialize_recipe(d) for d in docs]
     return {
         "results": serialized,
@@ -113,16 +152,48 @@ async def get_all_recipes(
     }
 
 
+@router.get("/search")
+async def search_community_recipes(
+    q: str = Query(..., min_length=1),
+    page: int = 1,
+    per_page: int = 12,
+    ready: Optional[str] = Query(None, description="readyInMinutes bucket: " + ", ".join(b[0] for b in READY_BUCKETS)),
+    calories: Optional[str] = Query(None, description="calorie range: " + ", ".join(r[0] for r in CALORIE_RANGES)),
+    user: dict = Depends(get_current_principal)
+):
+    found = community_index.search(q, limit=per_page, offset=(page - 1) * per_page, ready=ready, calories=calories)
+    return {
+        "query": q,
+        "page": page,
+        "per_page": per_page,
+        **found,
+    }
+
+
+@router.post("/what-can-i-cook")
+async def what_can_i_cook(
+    payload: PantryIn,
+    user: dict = Depends(get_current_principal)
+):
+    # ranks community recipes by the share of their ingredients the caller has
+    results = ingredient_index.match(
+        payload.ingredients,
+        limit=payload.limit,
+        min_coverage=payload.min_coverage,
+        max_missing=payload.max_missing,
+    )
+    return {"results": results}
+
+
 @router.get("/", response_model=List[MyRecipeOut])
-async def get_my_recipes(user: dict = Depends(get_current_user)):
+async def get_my_recipes(user: dict = Depends(get_current_principal)):
     user_id = str(user["_id"])
-    docs = list(db.my_recipes.find({"user_id": user_id}))
-    return [serialize_recipe(d) for d in docs]
+    return [serialize_recipe(d) async for d in db.my_recipes.find({"user_id": user_id})]
 
 
 @router.get("/{recipe_id}", response_model=MyRecipeOut)
-async def get_one_recipe(recipe_id: str, user: dict = Depends(get_current_user)):
-    doc = db.my_recipes.find_one({"_id": ObjectId(recipe_id)})
+async def get_one_recipe(recipe_id: str, user: dict = Depends(get_current_principal)):
+    doc = await db.my_recipes.find_one({"_id": ObjectId(recipe_id)})
 
     if not doc:
         raise HTTPException(404, "Recipe not Found")
@@ -145,7 +216,7 @@ async def update_recipe(
     user: dict = Depends(get_current_user),
     source_type: str = Form(...),
 ):
-    doc = db.my_recipes.find_one({"_id":ObjectId(recipe_id)})
+    doc = await db.my_recipes.find_one({"_id":ObjectId(recipe_id)})
 
     if not doc:
         raise HTTPException(404, "Recipe Not Found")
@@ -159,11 +230,7 @@ async def update_recipe(
     except:
         raise HTTPException(400, "Invalid JSON for ingredients or steps")
 
-    if image:
-        contents = await image.read()
-        image_url = upload_image(contents)
-    else:
-        image_url = doc.get("image")
+    contents = await read_upload(image) if image else None
 
     update_data = {
         "title": title,
@@ -172,18 +239,28 @@ async def update_recipe(
         "calories": calories,
         "ingredients": ingredients_data,
         "steps": steps_data,
-        "image": image_url,
         "source_type":source_type
     }
+    if contents:
+        # the current image stays until the new one is ready
+        update_data.update({"image_status": "pending", "image_token": new_image_token()})
+
+    await db.my_recipes.update_one({"_id": ObjectId(recipe_id)}, {"$set": update_data})
 
-    db.my_recipes.update_one({"_id": ObjectId(recipe_id)}, {"$set": update_data})
+    updated = await db.my_recipes.find_one({"_id": ObjectId(recipe_id)})
+    await index_recipe(updated)
 
-    updated = db.my_recipes.find_one({"_id": ObjectId(recipe_id)})
+    if contents:
+        await job_queue.enqueue(
+            "recipe_image",
+            {"recipe_id": recipe_id, "token": update_data["image_token"], "data": contents},
+            user_id=str(user["_id"]),
+        )
     return serialize_recipe(updated)
 
 @router.delete("/{recipe_id}")
 async def delete_recipe(recipe_id: str, user: dict = Depends(get_current_user)):
-    doc = db.my_recipes.find_one({"_id": ObjectId(recipe_id)})
+    doc = await db.my_recipes.find_one({"_id": ObjectId(recipe_id)})
 
     if not doc:
         raise HTTPException(404, "Recipe Not Found")
@@ -191,6 +268,8 @@ async def delete_recipe(recipe_id: str, user: dict = Depends(get_current_user)):
     if str(doc["user_id"]) != str(user["_id"]):
         raise HTTPException(403, "Not Authorized")
 
-    db.my_recipes.delete_one({"_id": ObjectId(recipe_id)})
+    await db.my_recipes.delete_one({"_id": ObjectId(recipe_id)})
+    invalidate_count(db.my_recipes, {})
+    await unindex_recipe(recipe_id)
 
     return {"message": "Recipe Deleted"}
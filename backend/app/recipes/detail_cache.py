@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from pymongo import UpdateOne
+
+from app.database import db
+from app.utils import spoonacular
+
+logger = logging.getLogger(__name__)
+
+collection = db.spoonacular_recipes
+
+# fresh: served as-is; stale: served while a background refresh runs;
+# past stale but before expiry: refetched inline, served only if upstream fails
+FRESH_SECONDS = int(os.getenv("RECIPE_CACHE_FRESH_SECONDS", str(24 * 3600)))
+STALE_SECONDS = int(os.getenv("RECIPE_CACHE_STALE_SECONDS", str(7 * 24 * 3600)))
+MAX_AGE_SECONDS = int(os.getenv("RECIPE_CACHE_MAX_AGE_SECONDS", str(30 * 24 * 3600)))
+
+_refreshing: set = set()
+_tasks: set = set()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # pymongo hands back naive datetimes unless tz_aware=True
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def get_cached(recipe_id: str) -> Optional[dict]:
+    return await collection.find_one({"_id": str(recipe_id)})
+
+
+async def get_many(recipe_ids: List[str]) -> Dict[str, dict]:
+    docs = collection.find({"_id": {"$in": [str(r) for r in recipe_ids]}})
+    return {doc["_id"]: doc async for doc in docs}
+
+
+def _cache_fields(recipe: dict) -> dict:
+    now = _now()
+    return {
+        "recipe": recipe,
+        "fetched_at": now,
+        "fresh_until": now + timedelta(seconds=FRESH_SECONDS),
+        "stale_until": now + timedelta(seconds=STALE_SECONDS),
+        "expires_at": now + timedelta(seconds=MAX_AGE_SECONDS),
+    }
+
+
+async def store(recipe_id: str, recipe: dict):
+    await collection.update_one({"_id": str(recipe_id)}, {"$set": _cache_fields(recipe)}, upsert=True)
+
+
+async def store_many(recipes: Dict[str, dict]):
+    if recipes:
+        await collection.bulk_write(
+            [UpdateOne({"_id": str(rid)}, {"$set": _cache_fields(r)}, upsert=True) for rid, r in recipes.items()],
+            ordered=False,
+        )
+
+
+def freshness(doc: Optional[dict]) -> str:
+    # "fresh", "stale" (serve and refresh in background) or "expired" (refetch)
+    if not doc:
+        return "expired"
+    now = _now()
+    if now < _as_utc(doc["fresh_until"]):
+        return "fresh"
+    if now < _as_utc(doc["stale_until"]):
+        return "stale"
+    return "expired"
+
+
+def fresh_seconds_left(doc: Optional[dict]) -> float:
+    if not doc:
+        return 0.0
+    return (_as_utc(doc["fresh_until"]) - _now()).total_seconds()
+
+
+def _should_fall_back(exc: HTTPException) -> bool:
+    # upstream failures, including quota exhaustion (mapped to 503)
+    return exc.status_code >= 500
+
+
+async def _refresh(recipe_id: str, fetch: Callable[[str], Awaitable[dict]]):
+    spoonacular.current_priority.set("background")
+    try:
+        await store(recipe_id, await fetch(recipe_id))
+    except HTTPException as exc:
+        logger.warning("background refresh of recipe %s failed: %s", recipe_id, exc.detail)
+    finally:
+        _refreshing.discard(recipe_id)
+
+
+def schedule_refresh(recipe_id: str, fetch: Callable[[str], Awaitable[dict]]):
+    if recipe_id in _refreshing:
+        return
+    _refreshing.add(recipe_id)
+    task = asyncio.create_task(_refresh(recipe_id, fetch))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _refresh_many(recipe_ids: List[str], fetch_many: Callable[[List[str]], Awaitable[Dict[str, dict]]]):
+    spoonacular.current_priority.set("background")
+    try:
+        await store_many(await fetch_many(recipe_ids))
+    except HTTPException as exc:
+        logger.warning("background refresh of %d recipes failed: %s", len(recipe_ids), exc.detail)
+    finally:
+        _refreshing.difference_update(recipe_ids)
+
+
+def schedule_refresh_many(recipe_ids: List[str], fetch_many: Callable[[List[str]], Awaitable[Dict[str, dict]]]):
+    pending = [r for r in recipe_ids if r not in _refreshing]
+    if not pending:
+        return
+    _refreshing.update(pending)
+    task = asyncio.create_task(_refresh_many(pending, fetch_many))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def get_or_fetch(recipe_id: str, fetch: Callable[[str], Awaitable[dict]]) -> dict:
+    recipe_id = str(recipe_id)
+    doc = await get_cached(recipe_id)
+    state = freshness(doc)
+
+    if state == "fresh":
+        return doc["recipe"]
+    if state == "stale":
+        schedule_refresh(recipe_id, fetch)
+        return doc["recipe"]
+
+    try:
+        recipe = await fetch(recipe_id)
+    except HTTPException as exc:
+        if doc and _should_fall_back(exc):
+            return doc["recipe"]
+        raise
+
+    await store(recipe_id, recipe)
+    return recipe
+
+
+async def get_or_fetch_many(
+    recipe_ids: List[str],
+    fetch_many: Callable[[List[str]], Awaitable[Dict[str, dict]]],
+) -> Dict[str, dict]:
+    # one Mongo read for all ids, then at most one upstream call for the
+    # ones that are missing or expired; ids upstream doesn't know are left out
+    recipe_ids = [str(r) for r in recipe_ids]
+    docs = await get_many(recipe_ids)
+
+    found: Dict[str, dict] = {}
+    stale, expired = [], []
+    for rid in recipe_ids:
+        state = freshness(docs.get(rid))
+        if state == "expired":
+            expired.append(rid)
+            continue
+        found[rid] = docs[rid]["recipe"]
+        if state == "stale":
+            stale.append(rid)
+
+    if stale:
+        schedule_refresh_many(stale, fetch_many)
+
+    if expired:
+        try:
+            fetched = await fetch_many(expired)
+        except HTTPException as exc:
+            if not _should_fall_back(exc):
+                raise
+            for rid in expired:
+                if rid in docs:
+                    found[rid] = docs[rid]["recipe"]
+        else:
+            await store_many(fetched)
+            found.update(fetched)
+
+    return found
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import re
+from typing import Awaitable, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+# per-source latency budgets (seconds) for /api/recipes/search?source=all
+SPOONACULAR_TIMEOUT = float(os.getenv("FEDERATED_SPOONACULAR_TIMEOUT", "2.5"))
+COMMUNITY_TIMEOUT = float(os.getenv("FEDERATED_COMMUNITY_TIMEOUT", "0.5"))
+
+# reciprocal-rank-fusion constant; larger values flatten rank differences
+RRF_K = 60
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def _title_key(title: Optional[str]) -> str:
+    return _NON_ALNUM.sub(" ", (title or "").lower()).strip()
+
+
+async def run_source(coro: Awaitable, timeout: float) -> Tuple[str, Optional[dict]]:
+    # returns (status, page); a slow or failing source degrades to no results
+    try:
+        return "ok", await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        return "timeout", None
+    except (HTTPException, httpx.HTTPError):
+        return "error", None
+
+
+async def gather_sources(sources: Dict[str, Tuple[Awaitable, float]]) -> Dict[str, Tuple[str, Optional[dict]]]:
+    names = list(sources)
+    outcomes = await asyncio.gather(*(run_source(coro, timeout) for coro, timeout in sources.values()))
+    return dict(zip(names, outcomes))
+
+
+def merge_results(ranked_lists: Dict[str, List[dict]]) -> List[dict]:
+    # reciprocal rank fusion across sources. Within a source items stay
+    # distinct (keyed by id); an item is merged with at most one entry of the
+    # same normalized title from an earlier source. The first source listed
+    # wins ties and duplicates.
+    scores: Dict[Tuple[str, str], float] = {}
+    items: Dict[Tuple[str, str], dict] = {}
+    order: Dict[Tuple[str, str], int] = {}
+    by_title: Dict[str, List[Tuple[str, str]]] = {}
+
+    for source_rank, (source, results) in enumerate(ranked_lists.items()):
+        matched = set()
+        for rank, item in enumerate(results):
+            title = _title_key(item.get("title"))
+            key = next(
+                (k for k in by_title.get(title, ()) if k[0] != source and k not in matched),
+                None,
+            ) if title else None
+
+            if key is None:
+                key = (source, str(item.get("id") or item.get("recipe_id") or f"#{rank}"))
+                if key in items:
+                    # the same recipe twice in one source list: keep its best rank
+                    continue
+                items[key] = {**item, "source_type": source}
+                order[key] = source_rank
+                if title:
+                    by_title.setdefault(title, []).append(key)
+            else:
+                matched.add(key)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+    ranked = sorted(items, key=lambda k: (-scores[k], order[k]))
+    return [items[k] for k in ranked]
@@ -1,22 +1,30 @@
+import os
 import time
 from fastapi import APIRouter, Depends, Query, HTTPException
-from typing import Optional
-import os
+from typing import Dict, List, Optional
 import httpx
-from dotenv import load_dotenv
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 from app.database import db
-from app.auth.utils import get_current_user
-from pydantic import BaseModel, Field
-from bson import ObjectId
-
-load_dotenv()
+from app.auth.utils import get_current_principal, get_current_user
+from app.recipes import detail_cache, federated
+from app.search.index import community_index
+from app.utils.cache import MemoryBackend, ResponseCache, make_key
+from app.utils.pagination import cached_count, invalidate_count, keyset_page
+from app.utils.breaker import CircuitOpen
+from app.utils.quota import QuotaExceeded, bulk_cost
+from app.utils.singleflight import SingleFlight
+from app.utils.spoonacular import API_KEY, spoonacular_get
+from pydantic import BaseModel, Field, constr
 
 router = APIRouter()
 
-API_KEY = os.getenv("SPOONACULAR_API_KEY") or os.getenv("SPOONACULAR_KEY")
-BASE_URL = "https://api.spoonacular.com"
+BULK_MAX_IDS = int(os.getenv("RECIPE_BULK_MAX_IDS", "50"))
+
+class BulkRecipesIn(BaseModel):
+    # digits only: ids are joined into informationBulk's comma-separated `ids`
+    ids: List[constr(pattern=r"^\d+$")] = Field(..., min_length=1, max_length=BULK_MAX_IDS)
 
 class SaveRecipeIn(BaseModel):
     recipe_id: str
@@ -26,6 +34,96 @@ class SaveRecipeIn(BaseModel):
     calories: Optional[float] = None
     source_type: str = Field(..., pattern="^(spoonacular|community)$")
 
+search_cache = ResponseCache(
+    MemoryBackend(maxsize=int(os.getenv("SEARCH_CACHE_MAXSIZE", "1024"))),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "900")),
+)
+
+# last good copy of each search page, served when upstream is out of quota or failing
+search_stale_cache = ResponseCache(
+    MemoryBackend(maxsize=int(os.getenv("SEARCH_STALE_CACHE_MAXSIZE", "4096"))),
+    ttl=float(os.getenv("SEARCH_STALE_TTL", "86400")),
+)
+
+SEARCH_REFILL_MAX_CALLS = int(os.getenv("SEARCH_REFILL_MAX_CALLS", "3"))
+
+# identical concurrent upstream calls (same normalized key) share one request
+upstream_flight = SingleFlight()
+
+
+def upstream_error(status: int, retry_after: Optional[float] = None, not_found: str = "Not found") -> HTTPException:
+    # 402 (daily points used up) and 429 (rate limited) are our quota problems,
+    # not the client's: report them as 503 with Retry-After
+    if status in (402, 429):
+        headers = {"Retry-After": str(int(retry_after) + 1)} if retry_after is not None else None
+        return HTTPException(503, "Spoonacular quota exhausted, try again later", headers=headers)
+    if status == 404:
+        return HTTPException(404, not_found)
+    return HTTPException(502, f"Spoonacular error ({status})")
+
+
+async def call_spoonacular(path: str, params: dict, cost: float = 1.0, not_found: str = "Not found") -> httpx.Response:
+    try:
+        resp = await spoonacular_get(path, params=params, cost=cost)
+    except QuotaExceeded as exc:
+        raise upstream_error(exc.status, exc.retry_after)
+    except CircuitOpen as exc:
+        # fail fast; callers fall back to cached pages / recipes on 503
+        raise HTTPException(503, "Spoonacular unavailable", headers={"Retry-After": str(int(exc.retry_after) + 1)})
+    except httpx.HTTPError:
+        raise HTTPException(503, "Spoonacular unavailable")
+
+    if resp.status_code != 200:
+        raise upstream_error(resp.status_code, not_found=not_found)
+    return resp
+
+
+async def fetch_search_page(params: dict) -> dict:
+    key = make_key("complexSearch", params)
+    cached = await search_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        return await upstream_flight.do(key, lambda: _fetch_search_page(key, params))
+    except HTTPException as exc:
+        if exc.status_code < 500:
+            raise
+        stale = await search_stale_cache.get(key)
+        if stale is None:
+            raise
+        return {**stale, "stale": True}
+
+
+async def _fetch_search_page(key: str, params: dict) -> dict:
+    # complexSearch: 1 point + 0.01 per result, plus nutrition/information add-ons
+    resp = await call_spoonacular("/recipes/complexSearch", params, cost=1 + 0.01 * params.get("number", 10))
+
+    data = resp.json()
+    results = []
+
+    for item in data.get("results", []):
+        calories = None
+        for n in item.get("nutrition", {}).get("nutrients", []):
+            if n.get("name", "").lower() == "calories":
+                calories = n.get("amount")
+                break
+
+        results.append({
+            "id": item.get("id"),
+            "title": item.get("title"),
+            "image": item.get("image"),
+            "sourceUrl": item.get("sourceUrl"),
+            "readyInMinutes": item.get("readyInMinutes"),
+            "calories": calories,
+        })
+
+    page_data = {"results": results, "total_results": data.get("totalResults", 0)}
+    await search_cache.set(key, page_data)
+    await search_stale_cache.set(key, page_data)
+    return page_data
+
+
 @router.get("/search")
 async def search_recipes(
     q: str = Query(..., min_length=1),
@@ -41,17 +139,20 @@ async def search_recipes(
     sortDirection: Optional[str] = None,
     minCalories: Optional[int] = None,
     maxCalories: Optional[int] = None,
+    source: str = Query("spoonacular", pattern="^(spoonacular|community|all)$"),
+    offset: Optional[int] = Query(None, ge=0, description="Upstream offset; overrides page (use next_offset from a previous response)"),
+    refill: bool = False,
 ):
-    if not API_KEY:
+    if source != "community" and not API_KEY:
         raise HTTPException(500, "Missing Spoonacular API Key")
 
-    offset = (page - 1) * per_page
+    if offset is None:
+        offset = (page - 1) * per_page
 
     params = {
         "query": q,
         "number": per_page,
         "offset": offset,
-        "apiKey": API_KEY,
         "addRecipeInformation": True,
         "addRecipeNutrition": True,
     }
@@ -64,52 +165,123 @@ async def search_recipes(
     if excludeIngredients: params["excludeIngredients"] = excludeIngredients
     if sort: params["sort"] = sort
     if sortDirection: params["sortDirection"] = sortDirection
+    if minCalories is not None: params["minCalories"] = minCalories
+    if maxCalories is not None: params["maxCalories"] = maxCalories
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get(f"{BASE_URL}/recipes/complexSearch", params=params)
+    if source != "spoonacular":
+        return await federated_search(q, page, per_page, params, source, maxReadyTime, minCalories, maxCalories)
 
-    if resp.status_code != 200:
-        raise HTTPException(502, resp.json())
+    results, total, next_offset = await fetch_filtered_page(params, per_page, minCalories, maxCalories, refill)
 
-    data = resp.json()
+    return {
+        "query": q,
+        "page": page,
+        "per_page": per_page,
+        "total_results": total,
+        "results": results,
+        "next_offset": next_offset,
+    }
+
+
+async def fetch_filtered_page(params: dict, per_page: int, minCalories, maxCalories, refill: bool):
+    # calorie bounds are already applied by Spoonacular; the local filter only
+    # drops items without nutrition data. With refill, keep reading further
+    # upstream pages until this one is full, within SEARCH_REFILL_MAX_CALLS.
+    upstream_offset = params["offset"]
     results = []
+    total = 0
+    calls = 0
 
-    for item in data.get("results", []):
-        calories = None
-        for n in item.get("nutrition", {}).get("nutrients", []):
-            if n.get("name", "").lower() == "calories":
-                calories = n.get("amount")
-                break
+    while True:
+        page_data = await fetch_search_page({**params, "offset": upstream_offset})
+        calls += 1
+        total = page_data["total_results"]
+        fetched = page_data["results"]
 
-        results.append({
-            "id": item.get("id"),
-            "title": item.get("title"),
-            "image": item.get("image"),
-            "sourceUrl": item.get("sourceUrl"),
-            "readyInMinutes": item.get("readyInMinutes"),
-            "calories": calories,
-        })
+        for i, item in enumerate(fetched):
+            if filter_calories([item], minCalories, maxCalories):
+                results.append(item)
+                if len(results) == per_page:
+                    return results, total, upstream_offset + i + 1
+
+        upstream_offset += len(fetched)
+        if not refill or not fetched or upstream_offset >= total or calls >= SEARCH_REFILL_MAX_CALLS:
+            break
+
+    next_offset = upstream_offset if upstream_offset < total else None
+    return results, total, next_offset
 
+
+def filter_calories(results: list, minCalories: Optional[int], maxCalories: Optional[int]) -> list:
     # manual calorie filtering
-    if minCalories is not None or maxCalories is not None:
-        filtered = []
-        for r in results:
-            c = r.get("calories")
-            if c is None: 
-                continue
-            if minCalories is not None and c < minCalories:
-                continue
-            if maxCalories is not None and c > maxCalories:
-                continue
-            filtered.append(r)
-        results = filtered
+    if minCalories is None and maxCalories is None:
+        return results
+
+    filtered = []
+    for r in results:
+        c = r.get("calories")
+        if c is None: 
+            continue
+        if minCalories is not None and c < minCalories:
+            continue
+        if maxCalories is not None and c > maxCalories:
+            continue
+        filtered.append(r)
+    return filtered
+
+
+async def community_search_page(q: str, page: int, per_page: int, maxReadyTime: Optional[int]) -> dict:
+    found = community_index.search(q, limit=per_page, offset=(page - 1) * per_page)
+    results = [
+        {
+            "id": r["recipe_id"],
+            "title": r["title"],
+            "image": r["image"],
+            "readyInMinutes": r["readyInMinutes"],
+            "calories": r["calories"],
+        }
+        for r in found["results"]
+        if maxReadyTime is None or (r["readyInMinutes"] is not None and r["readyInMinutes"] <= maxReadyTime)
+    ]
+    return {"results": results, "total_results": found["total_results"]}
+
+
+async def federated_search(q, page, per_page, params, source, maxReadyTime, minCalories, maxCalories) -> dict:
+    # each source gets its own latency budget; a slow or failing source is
+    # reported in `sources` and the response carries whatever arrived in time
+    sources = {}
+    if source == "all" and API_KEY:
+        sources["spoonacular"] = (fetch_search_page(params), federated.SPOONACULAR_TIMEOUT)
+    sources["community"] = (community_search_page(q, page, per_page, maxReadyTime), federated.COMMUNITY_TIMEOUT)
+
+    outcomes = await federated.gather_sources(sources)
+
+    ranked_lists = {}
+    total = 0
+    for name, (status, page_data) in outcomes.items():
+        if page_data:
+            ranked_lists[name] = filter_calories(page_data["results"], minCalories, maxCalories)
+            total += page_data["total_results"]
+
+    # the sum is an upper bound: recipes found in both sources count twice, and
+    # the community total ignores the calorie and ready-time filters
+    community_filtered = minCalories is not None or maxCalories is not None or maxReadyTime is not None
+    total_exact = len(ranked_lists) <= 1 and not ("community" in ranked_lists and community_filtered)
+
+    statuses = {name: status for name, (status, _) in outcomes.items()}
+    if source == "all" and not API_KEY:
+        statuses["spoonacular"] = "error"
 
     return {
         "query": q,
         "page": page,
         "per_page": per_page,
-        "total_results": data.get("totalResults", 0),
-        "results": results
+        "source": source,
+        "total_results": total,
+        "total_exact": total_exact,
+        "results": federated.merge_results(ranked_lists)[:per_page],
+        "sources": statuses,
+        "partial": any(status != "ok" for status in statuses.values()),
     }
 
 
@@ -117,20 +289,31 @@ async def search_recipes(
 async def get_saved_recipes(
     page: int = 1,
     per_page: int = 12,
-    user: dict = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    user: dict = Depends(get_current_principal)
 ):
+    # pass `cursor` (empty for the first page) to switch to keyset pagination
     user_id = str(user["_id"])
     collection = db.saved_recipes
-
-    skip = (page - 1) * per_page
-    total = collection.count_documents({"user_id": user_id})
-
-    saved_items = list(
-        collection.find({"user_id": user_id}, {"_id": 0})
-        .sort("timestamp", -1)
-        .skip(skip)
-        .limit(per_page)
-    )
+    query = {"user_id": user_id}
+
+    total = await cached_count(collection, query) if include_total else None
+
+    next_cursor = None
+    if cursor is not None:
+        saved_items, next_cursor = await keyset_page(collection, query, "timestamp", cursor, per_page)
+        for item in saved_items:
+            item.pop("_id")
+    else:
+        skip = (page - 1) * per_page
+        saved_items = await (
+            collection.find(query, {"_id": 0})
+            .sort("timestamp", -1)
+            .skip(skip)
+            .limit(per_page)
+            .to_list()
+        )
 
     community_recipe_ids = [
         ObjectId(item["recipe_id"])
@@ -141,10 +324,10 @@ async def get_saved_recipes(
     print("Community recipe IDs:", community_recipe_ids)
     community_map = {}
     if community_recipe_ids:
-        cursor = db.my_recipes.find(
+        community_cursor = db.my_recipes.find(
             {"_id": {"$in": community_recipe_ids}}
         )
-        for r in cursor:
+        async for r in community_cursor:
             rid = str(r["_id"])
             community_map[rid] = {
                 "recipe_id": rid,
@@ -164,6 +347,14 @@ async def get_saved_recipes(
             if fresh:
                 final_results.append({**item, **fresh})
 
+    if cursor is not None:
+        return {
+            "per_page": per_page,
+            "total_results": total,
+            "results": final_results,
+            "next_cursor": next_cursor,
+        }
+
     return {
         "page": page,
         "per_page": per_page,
@@ -175,7 +366,7 @@ async def get_saved_recipes(
 @router.get("/saved_recipes")
 async def saved_recipes(
     source_type: str = Query(..., pattern="^(spoonacular|community)$"),
-    user: dict = Depends(get_current_user)):
+    user: dict = Depends(get_current_principal)):
     user_id = str(user["_id"])
     collection = db.saved_recipes
 
@@ -183,7 +374,7 @@ async def saved_recipes(
         {"user_id": user_id, 
         "source_type": source_type},
         {"_id": 0, "recipe_id": 1})
-    saved_ids = [item["recipe_id"] for item in saved_ids_cursor]
+    saved_ids = [item["recipe_id"] async for item in saved_ids_cursor]
 
     return {"saved_ids": saved_ids}
 
@@ -191,10 +382,10 @@ async def saved_recipes(
 @router.get("/is-saved/{recipe_id}")
 async def is_recipe_saved(
     recipe_id: str,
-    user: dict = Depends(get_current_user)
+    user: dict = Depends(get_current_principal)
 ):
     user_id = str(user["_id"])
-    exists = db.saved_recipes.find_one({
+    exists = await db.saved_recipes.find_one({
         "user_id": user_id,
         "recipe_id": recipe_id,
     })
@@ -209,9 +400,6 @@ async def save_recipe(
     user_id = str(user["_id"])
     saved_collection = db.saved_recipes
 
-    if saved_collection.find_one({"user_id": user_id, "recipe_id": payload.recipe_id,"source_type":payload.source_type}):
-        return {"message": "Recipe already saved"}
-
     saved_data = {
         "user_id": str(user["_id"]),
         "recipe_id": str(payload.recipe_id),
@@ -222,7 +410,13 @@ async def save_recipe(
     if payload.source_type == "spoonacular":
         saved_data.update(payload.model_dump(exclude={"recipe_id","source_type"}))
 
-    saved_collection.insert_one(saved_data)
+    # the unique {user_id, recipe_id, source_type} index rejects duplicates
+    try:
+        await saved_collection.insert_one(saved_data)
+    except DuplicateKeyError:
+        return {"message": "Recipe already saved"}
+
+    invalidate_count(saved_collection, {"user_id": user_id})
 
     return {"message": "Recipe saved successfully"}
 
@@ -236,7 +430,7 @@ async def unsave_recipe(
     user_id = str(user["_id"])
     saved_collection = db.saved_recipes
 
-    result = saved_collection.delete_one({
+    result = await saved_collection.delete_one({
         "user_id": user_id,
         "recipe_id": recipe_id,
         "source_type": source_type
@@ -245,25 +439,13 @@ async def unsave_recipe(
     if result.deleted_count == 0:
         return {"message": "Recipe was not saved"}
 
-    return {"message": "Recipe removed from saved"}
-
-
-@router.get("/{recipe_id}")
-async def get_recipe_details(recipe_id: str):
-    if not API_KEY:
-        raise HTTPException(500, "Missing Spoonacular API Key")
-
-    url = f"{BASE_URL}/recipes/{recipe_id}/information"
-    params = {"apiKey": API_KEY, "includeNutrition": True}
+    invalidate_count(saved_collection, {"user_id": user_id})
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get(url, params=params)
+    return {"message": "Recipe removed from saved"}
 
-    if resp.status_code != 200:
-        raise HTTPException(resp.status_code, "Recipe not found")
 
-    data = resp.json()
-    recipe = {
+def normalize_recipe(data: dict) -> dict:
+    return {
         "id": data.get("id"),
         "title": data.get("title"),
         "image": data.get("image"),
@@ -284,6 +466,46 @@ async def get_recipe_details(recipe_id: str):
         "nutrition": data.get("nutrition", {}).get("nutrients", []),
     }
 
-    return recipe
-        
 
+async def fetch_recipe_details(recipe_id: str) -> dict:
+    return await upstream_flight.do(f"information:{recipe_id}", lambda: _fetch_recipe_details(recipe_id))
+
+
+async def _fetch_recipe_details(recipe_id: str) -> dict:
+    params = {"includeNutrition": True}
+    resp = await call_spoonacular(f"/recipes/{recipe_id}/information", params, not_found="Recipe not found")
+    return normalize_recipe(resp.json())
+
+
+async def fetch_recipes_bulk(recipe_ids: List[str]) -> Dict[str, dict]:
+    key = "informationBulk:" + ",".join(sorted(recipe_ids))
+    return await upstream_flight.do(key, lambda: _fetch_recipes_bulk(recipe_ids))
+
+
+async def _fetch_recipes_bulk(recipe_ids: List[str]) -> Dict[str, dict]:
+    params = {"ids": ",".join(recipe_ids), "includeNutrition": True}
+    resp = await call_spoonacular("/recipes/informationBulk", params, cost=bulk_cost(len(recipe_ids)))
+    return {str(item.get("id")): normalize_recipe(item) for item in resp.json()}
+
+
+@router.post("/bulk")
+async def get_recipes_bulk(payload: BulkRecipesIn):
+    # cached recipes come from one Mongo read; the rest from one informationBulk call
+    if not API_KEY:
+        raise HTTPException(500, "Missing Spoonacular API Key")
+
+    recipe_ids = list(dict.fromkeys(payload.ids))
+    found = await detail_cache.get_or_fetch_many(recipe_ids, fetch_recipes_bulk)
+
+    return {
+        "results": [found[rid] for rid in recipe_ids if rid in found],
+        "missing": [rid for rid in recipe_ids if rid not in found],
+    }
+
+
+@router.get("/{recipe_id}")
+async def get_recipe_details(recipe_id: str):
+    if not API_KEY:
+        raise HTTPException(500, "Missing Spoonacular API Key")
+
+    return await detail_cache.get_or_fetch(recipe_id, fetch_recipe_details)
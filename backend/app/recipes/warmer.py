@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+from app.database import db
+from app.jobs.queue import job_queue
+from app.recipes import detail_cache
+from app.recipes.routes import fetch_recipes_bulk
+from app.utils import spoonacular
+from app.utils.quota import bulk_capacity, bulk_cost
+
+logger = logging.getLogger(__name__)
+
+# Popular-content cache warmer. Ranks Spoonacular recipes by saves plus
+# upcoming meal-plan entries and refreshes the top ones in the detail cache
+# with informationBulk calls, before they go stale, so detail views hit a warm
+# cache. Runs as the "warm_popular_recipes" job, enqueued once per
+# WARM_INTERVAL_HOURS inside the off-peak WARM_WINDOW_UTC, on the background
+# quota lane and within WARM_POINTS_BUDGET points per run.
+
+WARM_TOP_N = int(os.getenv("WARM_TOP_N", "200"))
+WARM_BATCH_SIZE = int(os.getenv("WARM_BATCH_SIZE", "25"))
+WARM_POINTS_BUDGET = float(os.getenv("WARM_POINTS_BUDGET", "50"))
+WARM_UPCOMING_DAYS = int(os.getenv("WARM_UPCOMING_DAYS", "14"))
+# a planned meal counts this many saves
+WARM_MEAL_PLAN_WEIGHT = float(os.getenv("WARM_MEAL_PLAN_WEIGHT", "2"))
+# refresh recipes whose fresh period ends within this many seconds
+WARM_AHEAD_SECONDS = int(os.getenv("WARM_AHEAD_SECONDS", str(12 * 3600)))
+WARM_WINDOW_UTC = os.getenv("WARM_WINDOW_UTC", "02:00-05:00")
+WARM_INTERVAL_HOURS = float(os.getenv("WARM_INTERVAL_HOURS", "24"))
+WARM_CHECK_SECONDS = float(os.getenv("WARM_CHECK_SECONDS", "600"))
+WARM_ENABLED = os.getenv("WARM_ENABLED", "1").lower() in ("1", "true", "yes")
+
+_task: Optional[asyncio.Task] = None
+
+
+def batch_sizes(total: int, budget: float, batch_size: int = WARM_BATCH_SIZE) -> List[int]:
+    # batches covering as many of `total` recipes as the points budget allows
+    sizes = []
+    while total > 0 and bulk_capacity(budget):
+        n = min(batch_size, total, bulk_capacity(budget))
+        sizes.append(n)
+        budget -= bulk_cost(n)
+        total -= n
+    return sizes
+
+
+async def popular_recipe_ids(limit: int = WARM_TOP_N) -> List[str]:
+    today = date.today()
+    saves = db.saved_recipes.aggregate([
+        {"$match": {"source_type": "spoonacular"}},
+        {"$group": {"_id": "$recipe_id", "n": {"$sum": 1}}},
+        {"$sort": {"n": -1}},
+        {"$limit": limit},
+    ])
+    planned = db.meal_plans.aggregate([
+        {"$match": {
+            "source_type": "spoonacular",
+            "date": {"$gte": today.isoformat(), "$lte": (today + timedelta(days=WARM_UPCOMING_DAYS)).isoformat()},
+        }},
+        {"$group": {"_id": "$source_id", "n": {"$sum": 1}}},
+        {"$sort": {"n": -1}},
+        {"$limit": limit},
+    ])
+
+    scores: Dict[str, float] = {}
+    for cursor, weight in ((await saves, 1.0), (await planned, WARM_MEAL_PLAN_WEIGHT)):
+        async for row in cursor:
+            rid = str(row["_id"])
+            scores[rid] = scores.get(rid, 0.0) + weight * row["n"]
+
+    return sorted(scores, key=lambda rid: -scores[rid])[:limit]
+
+
+async def warm_popular_recipes(limit: int = WARM_TOP_N, budget: float = WARM_POINTS_BUDGET) -> dict:
+    with spoonacular.priority_lane("background"):
+        return await _warm(limit, budget)
+
+
+async def _warm(limit: int, budget: float) -> dict:
+    candidates = await popular_recipe_ids(limit)
+    cached = await detail_cache.get_many(candidates)
+    due = [rid for rid in candidates if detail_cache.fresh_seconds_left(cached.get(rid)) < WARM_AHEAD_SECONDS]
+
+    summary = {"candidates": len(candidates), "due": len(due), "refreshed": 0, "points_spent": 0.0, "stopped": None}
+    start = 0
+    for n in batch_sizes(len(due), budget):
+        batch = due[start:start + n]
+        start += n
+        try:
+            recipes = await fetch_recipes_bulk(batch)
+        except HTTPException as exc:
+            # out of quota / upstream down: keep what was refreshed so far
+            summary["stopped"] = exc.detail
+            break
+        await detail_cache.store_many(recipes)
+        summary["refreshed"] += len(recipes)
+        summary["points_spent"] += bulk_cost(n)
+
+    if summary["stopped"] is None and start < len(due):
+        summary["stopped"] = "points budget"
+    logger.info("cache warm: %s", summary)
+    return summary
+
+
+def _in_window(now: datetime, window: str = WARM_WINDOW_UTC) -> bool:
+    start, end = (datetime.strptime(t.strip(), "%H:%M").time() for t in window.split("-"))
+    current = now.time()
+    if start <= end:
+        return start <= current < end
+    return current >= start or current < end  # window crosses midnight
+
+
+async def _schedule_once():
+    now = datetime.now(timezone.utc)
+    if not _in_window(now):
+        return
+    # one run per interval across all processes: the job _id names the
+    # interval, so every process after the first gets DuplicateKeyError
+    interval = WARM_INTERVAL_HOURS * 3600
+    bucket = datetime.fromtimestamp(now.timestamp() // interval * interval, timezone.utc)
+    try:
+        await job_queue.enqueue(
+            "warm_popular_recipes",
+            max_attempts=2,
+            job_id=f"warm_popular_recipes:{bucket:%Y-%m-%dT%H:%M}",
+        )
+    except DuplicateKeyError:
+        pass
+
+
+async def _scheduler():
+    while True:
+        try:
+            await _schedule_once()
+        except Exception:
+            logger.exception("cache warm scheduling failed")
+        await asyncio.sleep(WARM_CHECK_SECONDS)
+
+
+def start_scheduler():
+    global _task
+    if WARM_ENABLED and _task is None:
+        _task = asyncio.create_task(_scheduler())
+
+
+async def stop_scheduler():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
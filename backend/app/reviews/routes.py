@@ -1,9 +1,12 @@
 from pydantic import BaseModel, Field
 from fastapi import APIRouter, Depends, HTTPException
-from typing import Optional
+from typing import List, Optional
 from app.auth.utils import get_current_user
-from database import db
+from app.database import db
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from app.utils.pagination import cached_count, invalidate_count, keyset_page
+from app.reviews.stats import get_stats, get_stats_many, record_rating, summarize
 import time
 
 class ReviewCreate(BaseModel):
@@ -20,6 +23,13 @@ class ReviewOut(BaseModel):
     rating: Optional[str]
     created_at: int
 
+class RatingStatsKey(BaseModel):
+    recipe_id: str
+    source_type: str = Field(..., pattern="^(community|spoonacular)$")
+
+class RatingStatsIn(BaseModel):
+    recipes: List[RatingStatsKey] = Field(..., min_length=1, max_length=200)
+
 router = APIRouter()
 
 @router.post("/", status_code=201)
@@ -30,7 +40,7 @@ async def create_review(
     user_id = str(user["_id"])
 
     if(payload.source_type == "community"):
-        if not db.my_recipes.find_one({"_id": ObjectId(payload.recipe_id)}):
+        if not ObjectId.is_valid(payload.recipe_id) or not await db.my_recipes.find_one({"_id": ObjectId(payload.recipe_id)}):
             raise HTTPException(404, "Recipe Not Found")
     
     review = {
@@ -42,38 +52,70 @@ async def create_review(
         "created_at": int(time.time()),
         "updated_at": int(time.time()),
     }
+    # the unique {user_id, recipe_id, source_type} index enforces one review per user
     try:
-        result = db.recipe_reviews.insert_one(review)
-    except:
-        raise HTTPException(400, "You have already reviewed this recipe")
+        result = await db.recipe_reviews.insert_one(review)
+    except DuplicateKeyError:
+        raise HTTPException(409, "You have already reviewed this recipe")
     
+    await record_rating(payload.recipe_id, payload.source_type, payload.rating)
+    invalidate_count(db.recipe_reviews, {"recipe_id": payload.recipe_id, "source_type": payload.source_type})
     review["_id"] = str(result.inserted_id)
     return review
 
+@router.post("/stats")
+async def get_rating_stats(payload: RatingStatsIn):
+    # rating aggregates for many recipes in one read, for search/feed cards
+    stats = await get_stats_many([(r.recipe_id, r.source_type) for r in payload.recipes])
+    return {"results": [
+        {"recipe_id": recipe_id, "source_type": source_type, **summary}
+        for (recipe_id, source_type), summary in stats.items()
+    ]}
+
 @router.get("/")
 async def get_reviews(
     recipe_id: str,
     source_type: str,
     page: int = 1,
     per_page: int = 10,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
 ):
+    # pass `cursor` (empty for the first page) for keyset pagination
+    query = {"recipe_id": recipe_id, "source_type": source_type}
+    rating = await get_stats(recipe_id, source_type)
+    total = None
+    if include_total:
+        # the materialized count; only count reviews when no aggregate exists yet
+        total = rating["count"] if rating is not None else await cached_count(db.recipe_reviews, query)
+    if rating is None:
+        rating = summarize({})
+
+    if cursor is not None:
+        docs, next_cursor = await keyset_page(db.recipe_reviews, query, "created_at", cursor, per_page)
+        for r in docs:
+            r["_id"] = str(r["_id"])
+        return {
+            "results": docs,
+            "total": total,
+            "rating": rating,
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+        }
+
     skip = (page - 1) * per_page
 
-    cursor = db.recipe_reviews.find({
-        "recipe_id": recipe_id, "source_type": source_type
-    }).sort("created_at", -1).skip(skip).limit(per_page)
+    reviews_cursor = db.recipe_reviews.find(query).sort("created_at", -1).skip(skip).limit(per_page)
 
     reviews = []
-    for r in cursor:
+    async for r in reviews_cursor:
         r["_id"] = str(r["_id"])
         reviews.append(r)
     
-    total = db.recipe_reviews.count_documents(
-        {"recipe_id": recipe_id, "source_type": source_type}
-    )
     return {
         "results": reviews,
         "total": total,
+        "rating": rating,
         "page": page,
         "per_page": per_page
     }
\ No newline at end of file
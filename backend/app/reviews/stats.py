@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ReplaceOne
+
+from app.database import db
+
+# Materialized rating aggregates, one document per (source_type, recipe_id):
+#   {_id: "spoonacular:123", recipe_id, source_type, count, sum, histogram: {"1": n, ..., "5": n}}
+# Kept current with $inc on every new review so readers never scan recipe_reviews.
+# The $inc is a separate write from the review insert, so a crash between the
+# two leaves the aggregate one review short; rebuild_stats repairs that, and
+# runs at startup when the collection is empty (backfill) or by hand with
+#   python -m app.reviews.stats --rebuild
+
+collection = db.recipe_rating_stats
+
+RATINGS = ("1", "2", "3", "4", "5")
+
+
+def stats_id(recipe_id: str, source_type: str) -> str:
+    return f"{source_type}:{recipe_id}"
+
+
+async def record_rating(recipe_id: str, source_type: str, rating: int):
+    await collection.update_one(
+        {"_id": stats_id(recipe_id, source_type)},
+        {
+            "$inc": {"count": 1, "sum": rating, f"histogram.{rating}": 1},
+            "$setOnInsert": {"recipe_id": recipe_id, "source_type": source_type},
+        },
+        upsert=True,
+    )
+
+
+def summarize(doc: dict) -> dict:
+    count = doc.get("count", 0)
+    histogram = doc.get("histogram") or {}
+    return {
+        "count": count,
+        "average": round(doc.get("sum", 0) / count, 2) if count else None,
+        "histogram": {r: histogram.get(r, 0) for r in RATINGS},
+    }
+
+
+async def get_stats(recipe_id: str, source_type: str) -> Optional[dict]:
+    # None when the recipe has no aggregate yet (no reviews, or not backfilled)
+    doc = await collection.find_one({"_id": stats_id(recipe_id, source_type)})
+    return summarize(doc) if doc else None
+
+
+async def get_stats_many(keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], dict]:
+    # one $in read for any number of (recipe_id, source_type) pairs; recipes
+    # without reviews get zeroed stats
+    ids = {stats_id(recipe_id, source_type): (recipe_id, source_type) for recipe_id, source_type in keys}
+    found = {doc["_id"]: doc async for doc in collection.find({"_id": {"$in": list(ids)}})}
+    return {key: summarize(found.get(_id, {})) for _id, key in ids.items()}
+
+
+async def rebuild_stats() -> int:
+    # recomputes every aggregate from recipe_reviews (backfill / repair)
+    pipeline = [
+        {"$group": {
+            "_id": {"recipe_id": "$recipe_id", "source_type": "$source_type", "rating": "$rating"},
+            "n": {"$sum": 1},
+        }},
+    ]
+    docs: Dict[str, dict] = {}
+    async for row in await db.recipe_reviews.aggregate(pipeline):
+        key = row["_id"]
+        _id = stats_id(key["recipe_id"], key["source_type"])
+        doc = docs.setdefault(_id, {
+            "recipe_id": key["recipe_id"],
+            "source_type": key["source_type"],
+            "count": 0,
+            "sum": 0,
+            "histogram": {},
+        })
+        doc["count"] += row["n"]
+        doc["sum"] += key["rating"] * row["n"]
+        doc["histogram"][str(key["rating"])] = row["n"]
+
+    if docs:
+        await collection.bulk_write(
+            [ReplaceOne({"_id": _id}, doc, upsert=True) for _id, doc in docs.items()],
+            ordered=False,
+        )
+    await collection.delete_many({"_id": {"$nin": list(docs)}})
+    return len(docs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rebuild", action="store_true", help="recompute every aggregate from recipe_reviews")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.error("nothing to do (pass --rebuild)")
+    print(f"rebuilt stats for {asyncio.run(rebuild_stats())} recipe(s)")
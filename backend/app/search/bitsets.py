@@ -0,0 +1,26 @@
+from typing import Iterable, List
+
+# Sets of index slots packed into Python ints, shared by the search indexes.
+# AND/OR of two bitsets runs in C over machine words, far faster than the
+# same intersection on sets or dicts of slots.
+
+
+def to_bitset(slots: Iterable[int]) -> int:
+    buf = bytearray()
+    for slot in slots:
+        byte = slot >> 3
+        if byte >= len(buf):
+            buf.extend(bytes(byte - len(buf) + 1))
+        buf[byte] |= 1 << (slot & 7)
+    return int.from_bytes(buf, "little")
+
+
+def slots_of(bits: int) -> List[int]:
+    # set bits in ascending order; str.find walks the binary digits in C
+    digits = bin(bits)[:1:-1]
+    slots = []
+    i = digits.find("1")
+    while i != -1:
+        slots.append(i)
+        i = digits.find("1", i + 1)
+    return slots
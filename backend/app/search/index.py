@@ -0,0 +1,340 @@
+import bisect
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+from app.search.bitsets import slots_of, to_bitset
+from app.utils.cache import TTLCache
+
+# In-process inverted index over community recipes (my_recipes): BM25 ranking,
+# prefix and one-typo matching, and facet counts. Kept current by the
+# my_recipes create/update/delete handlers; each worker process holds its own
+# copy, and app.search.sync applies writes made by the other workers.
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {"a", "an", "and", "the", "of", "with", "in", "on", "for", "to", "or"}
+
+# term-frequency weight per field
+FIELD_WEIGHTS = {"title": 3, "description": 1, "ingredients": 2}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+PREFIX_WEIGHT = 0.8
+TYPO_WEIGHT = 0.6
+MAX_EXPANSIONS = 30
+MIN_TYPO_LENGTH = 4
+
+READY_BUCKETS = [("0-15", 0, 15), ("16-30", 16, 30), ("31-60", 31, 60), ("60+", 61, None)]
+CALORIE_RANGES = [("0-300", 0, 300), ("300-600", 300, 600), ("600-900", 600, 900), ("900+", 900, None)]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def ready_bucket(minutes) -> Optional[str]:
+    if minutes is None:
+        return None
+    for label, low, high in READY_BUCKETS:
+        if minutes >= low and (high is None or minutes <= high):
+            return label
+    return None
+
+
+def calorie_range(calories) -> Optional[str]:
+    if calories is None:
+        return None
+    for label, low, high in CALORIE_RANGES:
+        if calories >= low and (high is None or calories < high):
+            return label
+    return None
+
+
+def _deletes(term: str) -> List[str]:
+    return [term[:i] + term[i + 1:] for i in range(len(term))]
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    # Damerau-Levenshtein distance <= 1
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diff = [i for i in range(la) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+    if la > lb:
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+class RecipeSearchIndex:
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._slots: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._doc_terms: Dict[int, Dict[str, int]] = {}
+        self._doc_len: Dict[int, int] = {}
+        self._total_len = 0
+        self._meta: Dict[int, dict] = {}
+        self._ready: Dict[int, Optional[str]] = {}
+        self._calories: Dict[int, Optional[str]] = {}
+        self._impacts: Dict[str, Dict[int, float]] = {}
+        self._bits: Dict[str, int] = {}
+        self._impact_basis = (0, 0.0)
+        self._query_cache = TTLCache(maxsize=512, ttl=None)
+        self._version = 0
+        self._vocab: List[str] = []
+        self._deletes: Dict[str, set] = defaultdict(set)
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    # -- maintenance --------------------------------------------------------
+
+    def _add_term(self, term: str):
+        bisect.insort(self._vocab, term)
+        if len(term) >= MIN_TYPO_LENGTH:
+            for d in _deletes(term):
+                self._deletes[d].add(term)
+
+    def _drop_term(self, term: str):
+        i = bisect.bisect_left(self._vocab, term)
+        if i < len(self._vocab) and self._vocab[i] == term:
+            self._vocab.pop(i)
+        if len(term) >= MIN_TYPO_LENGTH:
+            for d in _deletes(term):
+                self._deletes[d].discard(term)
+                if not self._deletes[d]:
+                    del self._deletes[d]
+
+    def add(self, doc: dict):
+        # indexes or re-indexes a my_recipes document
+        recipe_id = str(doc.get("recipe_id") or doc["_id"])
+        self.remove(recipe_id)
+
+        terms: Dict[str, int] = defaultdict(int)
+        for t in tokenize(doc.get("title")):
+            terms[t] += FIELD_WEIGHTS["title"]
+        for t in tokenize(doc.get("description")):
+            terms[t] += FIELD_WEIGHTS["description"]
+        for ing in doc.get("ingredients") or []:
+            name = ing.get("name") if isinstance(ing, dict) else ing
+            for t in tokenize(name):
+                terms[t] += FIELD_WEIGHTS["ingredients"]
+
+        slot = self._free.pop() if self._free else len(self._ids)
+        if slot == len(self._ids):
+            self._ids.append(recipe_id)
+        else:
+            self._ids[slot] = recipe_id
+        self._slots[recipe_id] = slot
+
+        for term, tf in terms.items():
+            if term not in self._postings:
+                self._add_term(term)
+            self._postings[term][slot] = tf
+            self._impacts.pop(term, None)
+            if term in self._bits:
+                self._bits[term] |= 1 << slot
+
+        length = sum(terms.values())
+        self._doc_terms[slot] = dict(terms)
+        self._doc_len[slot] = length
+        self._total_len += length
+        self._meta[slot] = {
+            "recipe_id": recipe_id,
+            "title": doc.get("title"),
+            "image": doc.get("image"),
+            "readyInMinutes": doc.get("readyInMinutes"),
+            "calories": doc.get("calories"),
+        }
+        self._ready[slot] = ready_bucket(doc.get("readyInMinutes"))
+        self._calories[slot] = calorie_range(doc.get("calories"))
+        self._version += 1
+
+    def remove(self, recipe_id: str):
+        slot = self._slots.pop(str(recipe_id), None)
+        if slot is None:
+            return
+
+        for term in self._doc_terms.pop(slot):
+            self._impacts.pop(term, None)
+            posting = self._postings[term]
+            posting.pop(slot, None)
+            if term in self._bits:
+                self._bits[term] &= ~(1 << slot)
+            if not posting:
+                del self._postings[term]
+                self._bits.pop(term, None)
+                self._drop_term(term)
+
+        self._total_len -= self._doc_len.pop(slot)
+        del self._meta[slot]
+        del self._ready[slot]
+        del self._calories[slot]
+        self._ids[slot] = None
+        self._version += 1
+        self._free.append(slot)
+
+    async def load(self, collection):
+        self._reset()
+        projection = {"title": 1, "description": 1, "ingredients": 1, "image": 1, "readyInMinutes": 1, "calories": 1}
+        async for doc in collection.find({}, projection, batch_size=1000):
+            self.add(doc)
+
+    # -- querying -----------------------------------------------------------
+
+    def _expand(self, term: str, allow_prefix: bool) -> Dict[str, float]:
+        expansions = {}
+        if term in self._postings:
+            expansions[term] = 1.0
+
+        if allow_prefix:
+            i = bisect.bisect_left(self._vocab, term)
+            while i < len(self._vocab) and len(expansions) < MAX_EXPANSIONS and self._vocab[i].startswith(term):
+                expansions.setdefault(self._vocab[i], PREFIX_WEIGHT)
+                i += 1
+
+        if not expansions and len(term) >= MIN_TYPO_LENGTH:
+            candidates = set(self._deletes.get(term, ()))
+            for d in _deletes(term):
+                if d in self._postings:
+                    candidates.add(d)
+                candidates |= self._deletes.get(d, set())
+            for c in candidates:
+                if _within_one_edit(term, c):
+                    expansions[c] = TYPO_WEIGHT
+                    if len(expansions) >= MAX_EXPANSIONS:
+                        break
+
+        return expansions
+
+    def _impact(self, term: str) -> Dict[int, float]:
+        # per-term BM25 contributions, computed once and reused until the
+        # term's posting changes or corpus stats drift by more than 10%
+        n_docs = len(self._doc_terms)
+        avg_len = self._total_len / n_docs
+        basis_docs, basis_len = self._impact_basis
+        if abs(n_docs - basis_docs) > 0.1 * basis_docs or abs(avg_len - basis_len) > 0.1 * basis_len:
+            self._impacts.clear()
+            self._impact_basis = (n_docs, avg_len)
+
+        impact = self._impacts.get(term)
+        if impact is None:
+            posting = self._postings[term]
+            n_docs, avg_len = self._impact_basis
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            doc_len = self._doc_len
+            norm = BM25_K1 * (1 - BM25_B)
+            scale = BM25_K1 * BM25_B / avg_len
+            boost = idf * (BM25_K1 + 1)
+            impact = {slot: boost * tf / (tf + norm + scale * doc_len[slot]) for slot, tf in posting.items()}
+            self._impacts[term] = impact
+        return impact
+
+    def _bitset(self, term: str) -> int:
+        # built on first use, then kept current by add()/remove()
+        bits = self._bits.get(term)
+        if bits is None:
+            bits = self._bits[term] = to_bitset(self._postings[term])
+        return bits
+
+    def _conjunctive_scores(self, expanded_terms: List[Dict[str, float]]) -> Dict[int, float]:
+        # slots matching every term, scored. Matches are found by ANDing
+        # per-term bitsets (a term's expansions ORed together), so scoring
+        # only touches the final matches, not every posting.
+        if not expanded_terms:
+            return {}
+        matches = -1
+        for expansions in expanded_terms:
+            term_bits = 0
+            for expanded in expansions:
+                term_bits |= self._bitset(expanded)
+            matches &= term_bits
+            if not matches:
+                return {}
+
+        scores = dict.fromkeys(slots_of(matches), 0.0)
+        for expansions in expanded_terms:
+            impacts = [(self._impact(expanded), weight) for expanded, weight in expansions.items()]
+            if len(impacts) == 1:
+                impact, weight = impacts[0]
+                for slot in scores:
+                    scores[slot] += impact[slot] * weight
+                continue
+            # a document matching several expansions counts its best one
+            for slot in scores:
+                scores[slot] += max(impact.get(slot, 0.0) * weight for impact, weight in impacts)
+        return scores
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        offset: int = 0,
+        ready: Optional[str] = None,
+        calories: Optional[str] = None,
+    ) -> dict:
+        terms = tokenize(query)
+        if not terms or not self._doc_terms:
+            return {"total_results": 0, "results": [], "facets": {"readyInMinutes": {}, "calories": {}}}
+
+        cache_key = (self._version, tuple(terms), limit, offset, ready, calories)
+        cached = self._query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # a recipe must match every term; terms matching nothing at all (not
+        # even as a prefix or typo) are ignored. Only the last term is treated
+        # as a prefix (search-as-you-type).
+        expanded_terms = [self._expand(term, allow_prefix=(i == len(terms) - 1)) for i, term in enumerate(terms)]
+        scores = self._conjunctive_scores([e for e in expanded_terms if e])
+
+        facets = {
+            "readyInMinutes": dict(Counter(map(self._ready.get, scores))),
+            "calories": dict(Counter(map(self._calories.get, scores))),
+        }
+        facets["readyInMinutes"].pop(None, None)
+        facets["calories"].pop(None, None)
+
+        matches = scores.keys()
+        if ready:
+            matches = [slot for slot in matches if self._ready[slot] == ready]
+        if calories:
+            matches = [slot for slot in matches if self._calories[slot] == calories]
+
+        top = heapq.nlargest(offset + limit, matches, key=scores.__getitem__)[offset:]
+        results = []
+        for slot in top:
+            meta = self._meta[slot]
+            results.append({
+                "recipe_id": meta["recipe_id"],
+                "title": meta["title"],
+                "image": meta["image"],
+                "readyInMinutes": meta["readyInMinutes"],
+                "calories": meta["calories"],
+                "score": round(scores[slot], 4),
+            })
+
+        response = {"total_results": len(matches), "results": results, "facets": facets}
+        self._query_cache.set(cache_key, response)
+        return response
+
+
+community_index = RecipeSearchIndex()
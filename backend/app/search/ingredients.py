@@ -0,0 +1,232 @@
+import re
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.search.bitsets import to_bitset
+
+# ingredient -> recipe posting lists for the "what can I cook" matcher. Each
+# posting is a sorted array of recipe slots; slots only ever grow (an update
+# takes a new slot) so appends keep the arrays sorted. Queries run on bitset
+# copies of the postings (Python ints, built lazily and cached), summing them
+# with a bit-sliced counter so no per-recipe work happens until the top hits
+# are extracted.
+
+_NON_ALPHA = re.compile(r"[^a-z ]+")
+
+DESCRIPTORS = {
+    "fresh", "freshly", "chopped", "diced", "minced", "sliced", "grated", "large", "small",
+    "medium", "ripe", "raw", "cooked", "boneless", "skinless", "organic", "whole", "dried",
+    "finely", "roughly", "of", "to", "taste",
+}
+
+SYNONYMS = {
+    "scallion": "green onion",
+    "spring onion": "green onion",
+    "cilantro": "coriander",
+    "garbanzo bean": "chickpea",
+    "garbanzo": "chickpea",
+    "aubergine": "eggplant",
+    "courgette": "zucchini",
+    "capsicum": "bell pepper",
+    "caster sugar": "sugar",
+    "granulated sugar": "sugar",
+    "white sugar": "sugar",
+    "plain flour": "flour",
+    "all purpose flour": "flour",
+    "prawn": "shrimp",
+    "minced meat": "ground beef",
+    "beef mince": "ground beef",
+    "curd": "yogurt",
+    "yoghurt": "yogurt",
+}
+
+
+def singularize(word: str) -> str:
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes") or word.endswith(("ches", "shes", "xes", "sses")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us")):
+        return word[:-1]
+    return word
+
+
+def normalize_ingredient(name: Optional[str]) -> str:
+    words = _NON_ALPHA.sub(" ", (name or "").lower()).split()
+    phrase = " ".join(singularize(w) for w in words if w not in DESCRIPTORS)
+    return SYNONYMS.get(phrase, phrase)
+
+
+def _ingredient_names(doc: dict) -> Set[str]:
+    names = set()
+    for ing in doc.get("ingredients") or []:
+        name = normalize_ingredient(ing.get("name") if isinstance(ing, dict) else ing)
+        if name:
+            names.add(name)
+    return names
+
+
+def _add_to_counter(planes: List[int], bits: int):
+    # planes[i] holds bit i of every recipe's match count
+    carry = bits
+    for i, plane in enumerate(planes):
+        planes[i] = plane ^ carry
+        carry &= plane
+        if not carry:
+            return
+    planes.append(carry)
+
+
+def _count_equals(planes: List[int], value: int, mask: int) -> int:
+    if value >> len(planes):
+        return 0
+    for i, plane in enumerate(planes):
+        mask &= plane if (value >> i) & 1 else ~plane
+        if not mask:
+            break
+    return mask
+
+
+def _iter_slots_desc(bits: int):
+    while bits:
+        slot = bits.bit_length() - 1
+        yield slot
+        bits ^= 1 << slot
+
+
+class IngredientIndex:
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._postings: Dict[str, array] = {}
+        self._slots: Dict[str, int] = {}
+        self._next_slot = 0
+        self._required: Dict[int, Set[str]] = {}
+        self._meta: Dict[int, dict] = {}
+        self._by_size: Dict[int, Set[int]] = {}
+        self._bitsets: Dict[str, int] = {}
+        self._size_bitsets: Dict[int, int] = {}
+
+    def __len__(self):
+        return len(self._required)
+
+    def add(self, doc: dict):
+        recipe_id = str(doc.get("recipe_id") or doc["_id"])
+        self.remove(recipe_id)
+
+        names = _ingredient_names(doc)
+        if not names:
+            return
+
+        slot = self._next_slot
+        self._next_slot += 1
+        self._slots[recipe_id] = slot
+        self._required[slot] = names
+        self._by_size.setdefault(len(names), set()).add(slot)
+        self._size_bitsets.pop(len(names), None)
+        self._meta[slot] = {
+            "recipe_id": recipe_id,
+            "title": doc.get("title"),
+            "image": doc.get("image"),
+            "readyInMinutes": doc.get("readyInMinutes"),
+            "calories": doc.get("calories"),
+        }
+        for name in names:
+            self._postings.setdefault(name, array("I")).append(slot)
+            self._bitsets.pop(name, None)
+
+    def remove(self, recipe_id: str):
+        slot = self._slots.pop(str(recipe_id), None)
+        if slot is None:
+            return
+
+        names = self._required.pop(slot)
+        for name in names:
+            posting = self._postings[name]
+            i = bisect_left(posting, slot)
+            if i < len(posting) and posting[i] == slot:
+                del posting[i]
+            if not posting:
+                del self._postings[name]
+            self._bitsets.pop(name, None)
+
+        size = len(names)
+        self._by_size[size].discard(slot)
+        if not self._by_size[size]:
+            del self._by_size[size]
+        self._size_bitsets.pop(size, None)
+        del self._meta[slot]
+
+    async def load(self, collection):
+        self._reset()
+        projection = {"title": 1, "ingredients": 1, "image": 1, "readyInMinutes": 1, "calories": 1}
+        async for doc in collection.find({}, projection, batch_size=1000):
+            self.add(doc)
+
+        # build every bitset up front so the first queries don't pay for it
+        for name in self._postings:
+            self._bitset(name)
+        for size in self._by_size:
+            self._size_bitset(size)
+
+    def _bitset(self, name: str) -> int:
+        bits = self._bitsets.get(name)
+        if bits is None:
+            bits = self._bitsets[name] = to_bitset(self._postings[name])
+        return bits
+
+    def _size_bitset(self, size: int) -> int:
+        bits = self._size_bitsets.get(size)
+        if bits is None:
+            bits = self._size_bitsets[size] = to_bitset(self._by_size[size])
+        return bits
+
+    def match(
+        self,
+        have: Iterable[str],
+        limit: int = 20,
+        min_coverage: float = 0.0,
+        max_missing: Optional[int] = None,
+    ) -> List[dict]:
+        have_names = {n for n in (normalize_ingredient(h) for h in have) if n}
+        present = [n for n in have_names if n in self._postings]
+        if not present:
+            return []
+
+        planes: List[int] = []
+        for name in present:
+            _add_to_counter(planes, self._bitset(name))
+
+        # every (recipe size, matched count) pair, best coverage first,
+        # then fewest missing, then most matched
+        pairs = []
+        for size in self._by_size:
+            for count in range(1, min(size, len(present)) + 1):
+                missing = size - count
+                if count / size < min_coverage or (max_missing is not None and missing > max_missing):
+                    continue
+                pairs.append((-count / size, missing, -count, size))
+        pairs.sort()
+
+        results = []
+        for neg_coverage, missing, neg_count, size in pairs:
+            bits = _count_equals(planes, -neg_count, self._size_bitset(size))
+            for slot in _iter_slots_desc(bits):
+                results.append({
+                    **self._meta[slot],
+                    "coverage": round(-neg_coverage, 4),
+                    "matched_count": -neg_count,
+                    "missing_count": missing,
+                    "missing": sorted(self._required[slot] - have_names),
+                })
+                if len(results) >= limit:
+                    return results
+        return results
+
+
+ingredient_index = IngredientIndex()
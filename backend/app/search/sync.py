@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from bson import ObjectId
+
+from app.database import db
+from app.search.index import community_index
+from app.search.ingredients import ingredient_index
+
+logger = logging.getLogger(__name__)
+
+# Keeps the in-process search indexes of every worker current. The my_recipes
+# write paths call index_recipe / unindex_recipe, which update this process's
+# indexes and append the recipe id to `search_index_changes`; every process
+# polls that collection each SEARCH_SYNC_SECONDS and re-reads the recipes
+# changed since its watermark, so a write served by one uvicorn worker shows
+# up in the others within one interval. A process that could not poll for
+# longer than the change log is kept reloads everything.
+
+SYNC_SECONDS = float(os.getenv("SEARCH_SYNC_SECONDS", "5"))
+# changes are re-read this far behind the watermark, to cover writer clock
+# skew and inserts that commit out of order
+SYNC_OVERLAP_SECONDS = float(os.getenv("SEARCH_SYNC_OVERLAP_SECONDS", "5"))
+CHANGE_RETENTION_SECONDS = int(os.getenv("SEARCH_CHANGE_RETENTION_SECONDS", str(24 * 3600)))
+
+PROJECTION = {"title": 1, "description": 1, "ingredients": 1, "image": 1, "readyInMinutes": 1, "calories": 1}
+
+changes = db.search_index_changes
+INDEXES = (community_index, ingredient_index)
+
+_watermark: Optional[datetime] = None
+_synced_at: Optional[datetime] = None
+# change ids already applied inside the overlap window (including our own)
+_seen: Dict[ObjectId, datetime] = {}
+_task: Optional[asyncio.Task] = None
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # pymongo hands back naive datetimes unless tz_aware=True
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def _record(recipe_id: str):
+    now = _now()
+    change_id = ObjectId()
+    _seen[change_id] = now
+    await changes.insert_one({
+        "_id": change_id,
+        "recipe_id": recipe_id,
+        "at": now,
+        "expires_at": now + timedelta(seconds=CHANGE_RETENTION_SECONDS),
+    })
+
+
+async def index_recipe(doc: dict):
+    for index in INDEXES:
+        index.add(doc)
+    await _record(str(doc.get("recipe_id") or doc["_id"]))
+
+
+async def unindex_recipe(recipe_id: str):
+    for index in INDEXES:
+        index.remove(recipe_id)
+    await _record(str(recipe_id))
+
+
+async def load():
+    # full (re)load; changes from here on are picked up by the poller
+    global _watermark, _synced_at
+    started = _now()
+    for index in INDEXES:
+        await index.load(db.my_recipes)
+    _watermark = _synced_at = started
+    _seen.clear()
+
+
+async def sync_once():
+    global _watermark, _synced_at
+    now = _now()
+    if _synced_at is None or now - _synced_at > timedelta(seconds=CHANGE_RETENTION_SECONDS):
+        await load()
+        return
+
+    since = _watermark - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+    recipe_ids = set()
+    latest = _watermark
+    async for change in changes.find({"at": {"$gt": since}}, {"recipe_id": 1, "at": 1}):
+        at = _as_utc(change["at"])
+        latest = max(latest, at)
+        if change["_id"] in _seen:
+            continue
+        _seen[change["_id"]] = at
+        recipe_ids.add(change["recipe_id"])
+
+    if recipe_ids:
+        oids = [ObjectId(r) for r in recipe_ids if ObjectId.is_valid(r)]
+        found = {str(doc["_id"]): doc async for doc in db.my_recipes.find({"_id": {"$in": oids}}, PROJECTION)}
+        for recipe_id in recipe_ids:
+            doc = found.get(recipe_id)
+            for index in INDEXES:
+                if doc is not None:
+                    index.add(doc)
+                else:
+                    index.remove(recipe_id)
+
+    _watermark = latest
+    _synced_at = now
+    cutoff = latest - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+    for change_id in [c for c, at in _seen.items() if at < cutoff]:
+        del _seen[change_id]
+
+
+async def _poller():
+    while True:
+        await asyncio.sleep(SYNC_SECONDS)
+        try:
+            await sync_once()
+        except Exception:
+            logger.exception("search index sync failed")
+
+
+def start():
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(_poller())
+
+
+async def stop():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
@@ -9,7 +9,7 @@ router = APIRouter()
 
 auth_scheme = HTTPBearer()
 
-def get_current_user(token_data = Depends(auth_scheme)):
+async def get_current_user(token_data = Depends(auth_scheme)):
 
     token = token_data.credentials
 
@@ -22,7 +22,7 @@ def get_current_user(token_data = Depends(auth_scheme)):
             detail = "Invalid or expired token")
     
     users = db.users
-    user = users.find_one({"email" : email})
+    user = await users.find_one({"email" : email})
 
     if not user:
         raise HTTPException(
@@ -31,5 +31,5 @@ def get_current_user(token_data = Depends(auth_scheme)):
     return {"email" : user["email"]}
 
 @router.get("/me", response_model=UserOut)
-def get_me(current_user: dict = Depends(get_current_user)):
+async def get_me(current_user: dict = Depends(get_current_user)):
     return current_user 
\ No newline at end of file
@@ -0,0 +1,132 @@
+import os
+import time
+from collections import deque
+from typing import Optional
+
+# Circuit breaker for the Spoonacular client. Outcomes from the last
+# BREAKER_WINDOW_SECONDS are kept; once there are BREAKER_MIN_CALLS of them and
+# either the error rate (transport errors and 5xx) or the share of calls slower
+# than BREAKER_SLOW_CALL_SECONDS crosses its threshold, the breaker opens and
+# calls fail immediately for BREAKER_OPEN_SECONDS. It then lets a single probe
+# through (half-open): success closes it, failure opens it again.
+
+WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", "30"))
+MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+ERROR_THRESHOLD = float(os.getenv("BREAKER_ERROR_THRESHOLD", "0.5"))
+SLOW_CALL_SECONDS = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "3"))
+SLOW_THRESHOLD = float(os.getenv("BREAKER_SLOW_THRESHOLD", "0.6"))
+OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "15"))
+# successful latencies kept for the p95 estimate (used to time hedged requests)
+LATENCY_SAMPLES = int(os.getenv("BREAKER_LATENCY_SAMPLES", "200"))
+
+
+class CircuitOpen(Exception):
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"circuit open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+
+    def __init__(self):
+        self.state = "closed"
+        self._window: deque = deque()   # (timestamp, ok, slow)
+        self._errors = 0
+        self._slow = 0
+        self._latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+        self._p95: Optional[float] = None
+        self._opened_at = 0.0
+        self._probe_at = 0.0
+        self.counts = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def _trim(self, now: float):
+        while self._window and now - self._window[0][0] > WINDOW_SECONDS:
+            _, ok, slow = self._window.popleft()
+            self._errors -= not ok
+            self._slow -= slow
+
+    def before_call(self):
+        # raises CircuitOpen while open; in half-open admits one probe at a time
+        # (a probe that never reports back is replaced after OPEN_SECONDS)
+        if self.state == "closed":
+            return
+        now = time.monotonic()
+        if self.state == "open":
+            remaining = self._opened_at + OPEN_SECONDS - now
+            if remaining > 0:
+                self.counts["rejected"] += 1
+                raise CircuitOpen(remaining)
+            self.state = "half_open"
+        if now - self._probe_at < OPEN_SECONDS:
+            self.counts["rejected"] += 1
+            raise CircuitOpen(OPEN_SECONDS - (now - self._probe_at))
+        self._probe_at = now
+
+    def release(self):
+        # the call admitted by before_call() never reached upstream (e.g. the
+        # quota refused it); frees the half-open probe slot for the next caller
+        if self.state == "half_open":
+            self._probe_at = 0.0
+
+    def record(self, ok: bool, latency: float):
+        now = time.monotonic()
+        slow = latency > SLOW_CALL_SECONDS
+        self.counts["calls"] += 1
+        if not ok:
+            self.counts["failures"] += 1
+        else:
+            self._latencies.append(latency)
+            self._p95 = None
+
+        if self.state == "half_open":
+            if ok and not slow:
+                self._close()
+            else:
+                self._open(now)
+            return
+
+        self._window.append((now, ok, slow))
+        self._errors += not ok
+        self._slow += slow
+        self._trim(now)
+
+        total = len(self._window)
+        if self.state == "closed" and total >= MIN_CALLS and (
+            self._errors / total >= ERROR_THRESHOLD or self._slow / total >= SLOW_THRESHOLD
+        ):
+            self._open(now)
+
+    def _open(self, now: float):
+        self.state = "open"
+        self._opened_at = now
+        self._probe_at = 0.0
+        self.counts["opened"] += 1
+
+    def _close(self):
+        self.state = "closed"
+        self._window.clear()
+        self._errors = 0
+        self._slow = 0
+
+    def p95(self) -> Optional[float]:
+        if self._p95 is None and len(self._latencies) >= MIN_CALLS:
+            ordered = sorted(self._latencies)
+            self._p95 = ordered[int(0.95 * (len(ordered) - 1))]
+        return self._p95
+
+    def stats(self) -> dict:
+        self._trim(time.monotonic())
+        total = len(self._window)
+        p95 = self.p95()
+        return {
+            **self.counts,
+            "state": self.state,
+            "window_calls": total,
+            "error_rate": round(self._errors / total, 3) if total else 0.0,
+            "slow_rate": round(self._slow / total, 3) if total else 0.0,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+        }
+
+
+breaker = CircuitBreaker()
@@ -0,0 +1,121 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    # in-process LRU with per-entry expiry; ttl=None means entries never expire
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class MemoryBackend:
+    # storage backends expose async get/set/delete so Mongo or Redis
+    # stores can be dropped in behind ResponseCache without touching callers
+
+    def __init__(self, maxsize: int = 1024):
+        self._cache = TTLCache(maxsize=maxsize, ttl=None)
+
+    async def get(self, key: str) -> Any:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float]):
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, key: str):
+        self._cache.delete(key)
+
+    def stats(self) -> dict:
+        return {"size": len(self._cache), "maxsize": self._cache.maxsize}
+
+
+class ResponseCache:
+
+    def __init__(self, backend=None, ttl: float = 600):
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Any:
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        await self.backend.set(key, value, self.ttl if ttl is None else ttl)
+
+    async def delete(self, key: str):
+        await self.backend.delete(key)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            **self.backend.stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def _normalize_value(value: Any) -> Any:
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if "," in value:
+            return ",".join(sorted(v.strip() for v in value.split(",") if v.strip()))
+    return value
+
+
+def make_key(prefix: str, params: dict) -> str:
+    # order-insensitive, case-insensitive key; credentials and empty values are dropped
+    normalized = {
+        k: _normalize_value(v)
+        for k, v in params.items()
+        if k.lower() != "apikey" and v is not None and v != ""
+    }
+    return f"{prefix}:{json.dumps(normalized, sort_keys=True, separators=(',', ':'))}"
@@ -10,4 +10,9 @@ cloudinary.config(
 
 def upload_image(file):
     result = cloudinary.uploader.upload(file)
-    return result["secure_url"]
\ No newline at end of file
+    return result["secure_url"]
+
+def upload_variant(file, public_id):
+    # uploads under a fixed public_id (overwriting) so re-processing an image is idempotent
+    result = cloudinary.uploader.upload(file, public_id=public_id, overwrite=True, resource_type="image")
+    return result["secure_url"]
@@ -0,0 +1,80 @@
+import asyncio
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from fastapi import HTTPException, UploadFile
+
+# Pillow is optional: without it the original bytes are stored as-is
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(5 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+
+# variant name -> max width (px); "large" is the one stored as the recipe's `image`
+VARIANT_WIDTHS = {"thumb": 320, "medium": 800, "large": 1600}
+PRIMARY_VARIANT = "large"
+
+# a small dedicated pool so image work can't starve the default executor
+_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="images")
+
+
+async def read_upload(upload: UploadFile, limit: int = MAX_IMAGE_BYTES) -> bytes:
+    # reads in chunks and stops as soon as the cap is exceeded, rather than
+    # buffering an arbitrarily large body first
+    buf = bytearray()
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        buf.extend(chunk)
+        if len(buf) > limit:
+            raise HTTPException(413, f"Image larger than {limit // (1024 * 1024)} MB")
+    if not buf:
+        raise HTTPException(400, "Empty image upload")
+    return bytes(buf)
+
+
+def make_variants(data: bytes) -> Dict[str, bytes]:
+    # blocking; run through build_variants
+    if Image is None:
+        return {"original": data}
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+            variants = {}
+            for name, width in VARIANT_WIDTHS.items():
+                variant = img.copy()
+                variant.thumbnail((width, width * 4))
+                out = io.BytesIO()
+                variant.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+                variants[name] = out.getvalue()
+            return variants
+    except (OSError, ValueError) as exc:
+        raise ValueError(f"unreadable image: {exc}") from exc
+
+
+async def build_variants(data: bytes) -> Dict[str, bytes]:
+    return await asyncio.get_running_loop().run_in_executor(_executor, make_variants, data)
+
+
+def variant_key(prefix: str, name: str) -> str:
+    return f"{prefix}/{name}.webp" if name != "original" else f"{prefix}/original"
+
+
+def primary_url(urls: Dict[str, str]) -> Optional[str]:
+    return urls.get(PRIMARY_VARIANT) or urls.get("original")
+
+
+def shutdown_image_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,87 @@
+import base64
+import json
+import os
+from typing import Any, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+from app.utils.cache import TTLCache
+
+# keyset ("cursor") pagination over (sort field desc, _id desc). Cursors are
+# opaque to clients: base64 of the last item's sort value and _id.
+
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "60"))
+
+count_cache = TTLCache(maxsize=4096, ttl=COUNT_CACHE_TTL)
+
+
+def encode_cursor(sort_value: Any, doc_id: ObjectId) -> str:
+    raw = json.dumps([sort_value, str(doc_id)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, doc_id = json.loads(raw)
+        return sort_value, ObjectId(doc_id)
+    except (ValueError, TypeError, InvalidId):
+        raise HTTPException(400, "Invalid cursor")
+
+
+def keyset_filter(field: str, cursor: Optional[str]) -> dict:
+    if not cursor:
+        return {}
+
+    sort_value, doc_id = decode_cursor(cursor)
+    if field == "_id":
+        return {"_id": {"$lt": doc_id}}
+    return {"$or": [
+        {field: {"$lt": sort_value}},
+        {field: sort_value, "_id": {"$lt": doc_id}},
+    ]}
+
+
+def keyset_sort(field: str) -> list:
+    if field == "_id":
+        return [("_id", -1)]
+    return [(field, -1), ("_id", -1)]
+
+
+async def keyset_page(collection, query: dict, field: str, cursor: Optional[str], limit: int, projection: Optional[dict] = None):
+    # returns (docs, next_cursor); next_cursor is None on the last page
+    after = keyset_filter(field, cursor)
+    full_query = {"$and": [query, after]} if after else query
+
+    docs = await collection.find(full_query, projection).sort(keyset_sort(field)).limit(limit + 1).to_list()
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(None if field == "_id" else last.get(field), last["_id"])
+
+    return docs, next_cursor
+
+
+def _count_key(collection, query: dict) -> tuple:
+    return (collection.name, json.dumps(query, sort_keys=True, default=str))
+
+
+async def cached_count(collection, query: dict) -> int:
+    # exact counts are cached briefly; an empty filter uses the collection metadata estimate
+    key = _count_key(collection, query)
+    total = count_cache.get(key)
+    if total is None:
+        if query:
+            total = await collection.count_documents(query)
+        else:
+            total = await collection.estimated_document_count()
+        count_cache.set(key, total)
+    return total
+
+
+def invalidate_count(collection, query: dict):
+    count_cache.delete(_count_key(collection, query))
@@ -0,0 +1,187 @@
+import asyncio
+import math
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import httpx
+
+# Client-side budget for Spoonacular points, shared by every upstream call.
+#
+# A token bucket (SPOONACULAR_POINTS_PER_SECOND refill, SPOONACULAR_POINTS_BURST
+# capacity) throttles spending; "background" callers (cache warming, refresh
+# jobs) may only spend tokens above INTERACTIVE_RESERVE, so user-facing detail
+# and search requests always find some. The X-API-Quota-Used / -Left headers of
+# every response keep the daily picture current, and a 402 (daily points used
+# up) or 429 (rate limited) from upstream closes the budget until it resets,
+# so callers fail fast and serve cached data instead of hammering Spoonacular.
+
+POINTS_PER_SECOND = float(os.getenv("SPOONACULAR_POINTS_PER_SECOND", "2"))
+POINTS_BURST = float(os.getenv("SPOONACULAR_POINTS_BURST", "20"))
+INTERACTIVE_RESERVE = float(os.getenv("SPOONACULAR_INTERACTIVE_RESERVE", "5"))
+# daily points kept back from background work once the headers say we're low
+DAILY_RESERVE = float(os.getenv("SPOONACULAR_DAILY_RESERVE", "20"))
+INTERACTIVE_MAX_WAIT = float(os.getenv("SPOONACULAR_INTERACTIVE_MAX_WAIT", "1"))
+BACKGROUND_MAX_WAIT = float(os.getenv("SPOONACULAR_BACKGROUND_MAX_WAIT", "30"))
+RATE_LIMIT_COOLDOWN = float(os.getenv("SPOONACULAR_RATE_LIMIT_COOLDOWN", "60"))
+
+PRIORITIES = ("interactive", "background")
+
+# informationBulk pricing: 1 point for the first recipe, 0.5 for each additional one
+BULK_FIRST_POINTS = 1.0
+BULK_EXTRA_POINTS = 0.5
+
+
+class QuotaExceeded(Exception):
+    # raised instead of calling upstream; `status` is the upstream status it
+    # stands for (402 daily quota, 429 rate limit)
+
+    def __init__(self, status: int, retry_after: float):
+        super().__init__(f"Spoonacular quota exceeded ({status}), retry in {retry_after:.0f}s")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _seconds_until_utc_midnight() -> float:
+    # Spoonacular resets daily points at midnight UTC
+    now = datetime.now(timezone.utc)
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - now).total_seconds()
+
+
+def bulk_cost(n: int) -> float:
+    # points for an informationBulk call fetching `n` recipes
+    return BULK_FIRST_POINTS + BULK_EXTRA_POINTS * (n - 1) if n else 0.0
+
+
+def bulk_capacity(budget: float) -> int:
+    # most recipes one informationBulk call can fetch within `budget` points
+    if budget < BULK_FIRST_POINTS:
+        return 0
+    return math.floor((budget - BULK_FIRST_POINTS) / BULK_EXTRA_POINTS) + 1
+
+
+def _header_float(resp: httpx.Response, name: str) -> Optional[float]:
+    try:
+        return float(resp.headers[name])
+    except (KeyError, ValueError):
+        return None
+
+
+class QuotaManager:
+
+    def __init__(
+        self,
+        rate: float = POINTS_PER_SECOND,
+        burst: float = POINTS_BURST,
+        interactive_reserve: float = INTERACTIVE_RESERVE,
+        daily_reserve: float = DAILY_RESERVE,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.interactive_reserve = min(interactive_reserve, burst)
+        self.daily_reserve = daily_reserve
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._blocked_status = 0
+        self.quota_used: Optional[float] = None
+        self.quota_left: Optional[float] = None
+        self.counts = {"granted": 0, "rejected": 0, "waited": 0, "upstream_402": 0, "upstream_429": 0}
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _floor(self, priority: str) -> float:
+        return self.interactive_reserve if priority == "background" else 0.0
+
+    def check(self, priority: str = "interactive", cost: float = 1.0):
+        # raises QuotaExceeded when the budget is closed for this lane
+        now = time.monotonic()
+        if now < self._blocked_until:
+            raise QuotaExceeded(self._blocked_status, self._blocked_until - now)
+        if priority == "background" and self.quota_left is not None and self.quota_left - cost < self.daily_reserve:
+            raise QuotaExceeded(402, _seconds_until_utc_midnight())
+
+    async def acquire(self, priority: str = "interactive", cost: float = 1.0):
+        # takes `cost` tokens, waiting up to the lane's max wait for a refill.
+        # Waiters re-check after each sleep; background waiters need tokens
+        # above the interactive reserve, so interactive callers get served first.
+        self.check(priority, cost)
+        max_wait = INTERACTIVE_MAX_WAIT if priority == "interactive" else BACKGROUND_MAX_WAIT
+        floor = self._floor(priority)
+        # calls costing more than the burst take the bucket negative; later
+        # callers then wait for the debt to be repaid
+        needed = floor + min(cost, self.burst - floor)
+        deadline = time.monotonic() + max_wait
+        waited = False
+
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= needed:
+                break
+            wait = (needed - self._tokens) / self.rate if self.rate > 0 else float("inf")
+            if now + wait > deadline:
+                self.counts["rejected"] += 1
+                raise QuotaExceeded(429, wait)
+            waited = True
+            await asyncio.sleep(wait)
+            self.check(priority, cost)
+
+        self._tokens -= cost
+        self.counts["granted"] += 1
+        if waited:
+            self.counts["waited"] += 1
+
+    def try_acquire(self, priority: str = "interactive", cost: float = 1.0) -> bool:
+        # non-blocking acquire, for optional work such as hedged requests
+        try:
+            self.check(priority, cost)
+        except QuotaExceeded:
+            return False
+        self._refill(time.monotonic())
+        if self._tokens < self._floor(priority) + cost:
+            return False
+        self._tokens -= cost
+        self.counts["granted"] += 1
+        return True
+
+    def record(self, resp: httpx.Response):
+        used = _header_float(resp, "X-API-Quota-Used")
+        left = _header_float(resp, "X-API-Quota-Left")
+        if used is not None:
+            self.quota_used = used
+        if left is not None:
+            self.quota_left = left
+
+        if resp.status_code == 402 or (left is not None and left <= 0):
+            self.counts["upstream_402"] += int(resp.status_code == 402)
+            self._block(402, _seconds_until_utc_midnight())
+        elif resp.status_code == 429:
+            self.counts["upstream_429"] += 1
+            retry_after = _header_float(resp, "Retry-After") or RATE_LIMIT_COOLDOWN
+            self._block(429, retry_after)
+
+    def _block(self, status: int, seconds: float):
+        until = time.monotonic() + seconds
+        if until > self._blocked_until:
+            self._blocked_until = until
+            self._blocked_status = status
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            **self.counts,
+            "tokens": round(self._tokens, 2),
+            "quota_used": self.quota_used,
+            "quota_left": self.quota_left,
+            "blocked_for": round(max(0.0, self._blocked_until - now), 1),
+            "blocked_status": self._blocked_status if now < self._blocked_until else None,
+        }
+
+
+quota = QuotaManager()
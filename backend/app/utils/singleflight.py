@@ -0,0 +1,53 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+
+class SingleFlight:
+    # concurrent callers with the same key share one in-flight call. The call
+    # runs in its own task so a disconnecting caller can't cancel it for the rest.
+
+    def __init__(self, max_tracked_keys: int = 1024):
+        self.max_tracked_keys = max_tracked_keys
+        self._inflight: dict = {}
+        self._per_key: OrderedDict = OrderedDict()
+        self.calls = 0
+        self.coalesced = 0
+
+    def _record(self, key: str, coalesced: bool):
+        self.calls += 1
+        counts = self._per_key.pop(key, None) or {"calls": 0, "coalesced": 0}
+        counts["calls"] += 1
+        if coalesced:
+            self.coalesced += 1
+            counts["coalesced"] += 1
+        self._per_key[key] = counts
+        while len(self._per_key) > self.max_tracked_keys:
+            self._per_key.popitem(last=False)
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # mark the exception retrieved; waiters re-raise it themselves
+            task.exception()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            self._record(key, coalesced=True)
+        else:
+            self._record(key, coalesced=False)
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def stats(self, top: int = 10) -> dict:
+        hottest = sorted(self._per_key.items(), key=lambda kv: kv[1]["coalesced"], reverse=True)[:top]
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "top_keys": [{"key": k, **v} for k, v in hottest if v["coalesced"]],
+        }
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from app.utils.breaker import breaker
+from app.utils.quota import quota
+
+load_dotenv()
+
+API_KEY = os.getenv("SPOONACULAR_API_KEY") or os.getenv("SPOONACULAR_KEY")
+BASE_URL = os.getenv("SPOONACULAR_BASE_URL", "https://api.spoonacular.com")
+
+# pool limits and timeouts (seconds) for the shared client
+MAX_CONNECTIONS = int(os.getenv("SPOONACULAR_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("SPOONACULAR_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("SPOONACULAR_KEEPALIVE_EXPIRY", "30"))
+TIMEOUT = float(os.getenv("SPOONACULAR_TIMEOUT", "10"))
+CONNECT_TIMEOUT = float(os.getenv("SPOONACULAR_CONNECT_TIMEOUT", "5"))
+
+# hedged requests: when a call hasn't answered after the observed p95 latency
+# (at least HEDGE_MIN_DELAY), send a duplicate and keep the first response.
+# Off by default since each hedge spends extra Spoonacular points.
+HEDGE_ENABLED = os.getenv("SPOONACULAR_HEDGE", "").lower() in ("1", "true", "yes")
+HEDGE_MIN_DELAY = float(os.getenv("SPOONACULAR_HEDGE_MIN_DELAY", "0.3"))
+
+# HTTP/2 needs the optional `h2` package (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+_client: Optional[httpx.AsyncClient] = None
+
+# quota lane for calls that don't pass `priority`; background tasks (cache
+# refreshes, jobs) set it to "background" for everything they call
+current_priority: ContextVar[str] = ContextVar("spoonacular_priority", default="interactive")
+
+hedge_stats = {"hedged": 0, "hedge_won": 0}
+
+
+@contextmanager
+def priority_lane(priority: str):
+    # sets current_priority for the block only; job workers are long-lived
+    # tasks, so a bare set() would leak the lane into every later job
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+def create_client(base_url: str = BASE_URL) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=base_url,
+        http2=HTTP2,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(TIMEOUT, connect=CONNECT_TIMEOUT),
+    )
+
+
+async def start_client():
+    global _client
+    if _client is None:
+        _client = create_client()
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    # started by the app lifespan; created lazily for scripts and workers
+    global _client
+    if _client is None:
+        _client = create_client()
+    return _client
+
+
+async def spoonacular_get(
+    path: str,
+    params: Optional[dict] = None,
+    timeout: Optional[float] = None,
+    priority: Optional[str] = None,
+    cost: float = 1.0,
+) -> httpx.Response:
+    # raises breaker.CircuitOpen or quota.QuotaExceeded without calling
+    # upstream while the circuit is open or the points budget is closed for
+    # this priority; `cost` is the estimated points
+    priority = priority or current_priority.get()
+    breaker.before_call()
+    try:
+        await quota.acquire(priority, cost)
+    except BaseException:
+        breaker.release()
+        raise
+
+    params = {**(params or {}), "apiKey": API_KEY}
+    kwargs = {}
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+
+    def send():
+        return _send(path, params, kwargs)
+
+    if HEDGE_ENABLED and breaker.state == "closed":
+        return await _hedged(send, priority, cost)
+    return await send()
+
+
+async def _send(path: str, params: dict, kwargs: dict) -> httpx.Response:
+    start = time.monotonic()
+    try:
+        resp = await get_client().get(path, params=params, **kwargs)
+    except httpx.HTTPError:
+        breaker.record(False, time.monotonic() - start)
+        raise
+    breaker.record(resp.status_code < 500, time.monotonic() - start)
+    quota.record(resp)
+    return resp
+
+
+async def _hedged(send, priority: str, cost: float) -> httpx.Response:
+    p95 = breaker.p95()
+    primary = asyncio.ensure_future(send())
+    tasks = {primary}
+    try:
+        if p95 is None:
+            return await primary
+
+        done, _ = await asyncio.wait(tasks, timeout=max(p95, HEDGE_MIN_DELAY))
+        if done or not quota.try_acquire(priority, cost):
+            return await primary
+
+        hedge_stats["hedged"] += 1
+        hedge = asyncio.ensure_future(send())
+        tasks.add(hedge)
+        pending = set(tasks)
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # first success wins; an error only surfaces once both calls failed
+            winners = [t for t in done if t.exception() is None]
+            if winners:
+                if hedge in winners and primary not in winners:
+                    hedge_stats["hedge_won"] += 1
+                return winners[0].result()
+            if not pending:
+                return done.pop().result()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,54 @@
+import asyncio
+import os
+from pathlib import Path
+
+# Pluggable image storage. IMAGE_STORAGE=cloudinary (default) uploads through
+# the Cloudinary SDK on a worker thread; IMAGE_STORAGE=local writes under
+# IMAGE_STORAGE_DIR and is meant for tests and local development.
+
+STORAGE_BACKEND = os.getenv("IMAGE_STORAGE", "cloudinary")
+LOCAL_STORAGE_DIR = os.getenv("IMAGE_STORAGE_DIR", "media")
+LOCAL_BASE_URL = os.getenv("IMAGE_BASE_URL", "/media")
+
+
+class CloudinaryStorage:
+
+    async def save(self, key: str, data: bytes) -> str:
+        # imported lazily so the local backend works without Cloudinary credentials
+        from app.utils.cloudinary import upload_variant
+        public_id = key.rsplit(".", 1)[0]
+        return await asyncio.to_thread(upload_variant, data, public_id)
+
+
+class LocalStorage:
+
+    def __init__(self, root: str = LOCAL_STORAGE_DIR, base_url: str = LOCAL_BASE_URL):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _write(self, key: str, data: bytes):
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".part")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+
+    async def save(self, key: str, data: bytes) -> str:
+        await asyncio.to_thread(self._write, key, data)
+        return f"{self.base_url}/{key}"
+
+
+_storage = None
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        _storage = LocalStorage() if STORAGE_BACKEND == "local" else CloudinaryStorage()
+    return _storage
+
+
+def set_storage(storage):
+    # swap the backend, e.g. LocalStorage(tmp_dir) in tests
+    global _storage
+    _storage = storage
@@ -0,0 +1,69 @@
+"""
+Login throughput vs. latency of concurrent non-auth work, with argon2 run
+inline on the event loop vs. in the bounded hashing pool.
+
+    cd backend
+    python -m benchmarks.login_throughput --logins 200 --concurrency 16
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.auth import utils
+
+PASSWORD = "correct horse battery staple"
+
+
+async def inline_login(hashed):
+    return utils.verify_password(PASSWORD, hashed)
+
+
+async def pooled_login(hashed):
+    valid, _ = await utils.verify_and_update_password(PASSWORD, hashed)
+    return valid
+
+
+async def search_probe(stop, latencies):
+    # stands in for a cached /api/recipes/search: should take ~1ms of wall time
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run(label, login, hashed, total, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+    probe_latencies = []
+    probe = asyncio.create_task(search_probe(stop, probe_latencies))
+
+    async def one():
+        async with sem:
+            await login(hashed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+
+    probe_latencies.sort()
+    p50 = statistics.median(probe_latencies)
+    p99 = probe_latencies[int(len(probe_latencies) * 0.99) - 1]
+    print(f"{label:<8} {total / elapsed:7.1f} logins/s  concurrent search p50={p50:7.2f}ms p99={p99:7.2f}ms")
+
+
+async def main(total, concurrency):
+    hashed = utils.hash_password(PASSWORD)
+    await run("inline", inline_login, hashed, total, concurrency)
+    await run("pooled", pooled_login, hashed, total, concurrency)
+    utils.shutdown_hash_executor()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.concurrency))
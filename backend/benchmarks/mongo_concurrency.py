@@ -0,0 +1,83 @@
+"""
+Throughput of async handlers using the blocking MongoClient vs. the async
+client, at N concurrent clients, against a local mongod.
+
+    cd backend
+    MONGO_URI=mongodb://localhost:27017/ python -m benchmarks.mongo_concurrency --clients 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from pymongo import AsyncMongoClient, MongoClient
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+DB_NAME = "recipefinder_bench"
+DOCS = 5000
+
+
+def seed():
+    client = MongoClient(MONGO_URI)
+    coll = client[DB_NAME].saved_recipes
+    coll.drop()
+    coll.insert_many([
+        {"user_id": f"user{i % 100}", "recipe_id": str(i), "source_type": "spoonacular", "timestamp": i}
+        for i in range(DOCS)
+    ])
+    coll.create_index([("user_id", 1), ("timestamp", -1)])
+    client.close()
+
+
+async def blocking_handler(coll, i):
+    # what the routers did before: sync driver calls inside `async def`
+    user_id = f"user{i % 100}"
+    coll.count_documents({"user_id": user_id})
+    list(coll.find({"user_id": user_id}).sort("timestamp", -1).limit(12))
+
+
+async def async_handler(coll, i):
+    user_id = f"user{i % 100}"
+    await coll.count_documents({"user_id": user_id})
+    await coll.find({"user_id": user_id}).sort("timestamp", -1).limit(12).to_list()
+
+
+async def run(label, handler, coll, total, clients):
+    sem = asyncio.Semaphore(clients)
+    latencies = []
+
+    async def one(i):
+        async with sem:
+            start = time.perf_counter()
+            await handler(coll, i)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<18} {total / elapsed:8.0f} req/s  p50={p50:7.2f}ms  p99={p99:7.2f}ms")
+
+
+async def main(total, clients):
+    sync_client = MongoClient(MONGO_URI, maxPoolSize=clients)
+    await run("sync MongoClient", blocking_handler, sync_client[DB_NAME].saved_recipes, total, clients)
+    sync_client.close()
+
+    async_client = AsyncMongoClient(MONGO_URI, maxPoolSize=clients)
+    await run("AsyncMongoClient", async_handler, async_client[DB_NAME].saved_recipes, total, clients)
+    await async_client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=200)
+    args = parser.parse_args()
+
+    seed()
+    asyncio.run(main(args.requests, args.clients))
@@ -0,0 +1,91 @@
+"""
+Per-request httpx clients vs. the shared pooled Spoonacular client, measured
+against a local stand-in server.
+
+    cd backend
+    python -m benchmarks.spoonacular_client --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from app.utils import spoonacular
+
+PORT = 8765
+PAYLOAD = json.dumps({"results": [{"id": i, "title": f"Recipe {i}"} for i in range(12)], "totalResults": 12}).encode()
+
+
+async def stand_in(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": PAYLOAD})
+
+
+def start_server():
+    config = uvicorn.Config(stand_in, host="127.0.0.1", port=PORT, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def fresh_client_call(base_url):
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        await client.get(f"{base_url}/recipes/complexSearch", params={"query": "pasta"})
+
+
+async def pooled_call(client):
+    await client.get("/recipes/complexSearch", params={"query": "pasta"})
+
+
+async def run(label, make_call, total, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            await make_call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<22} p50={p50:7.2f}ms  p99={p99:7.2f}ms  {total / elapsed:8.0f} req/s")
+
+
+async def main(total, concurrency):
+    base_url = f"http://127.0.0.1:{PORT}"
+    await run("per-request client", lambda: fresh_client_call(base_url), total, concurrency)
+
+    client = spoonacular.create_client(base_url)
+    try:
+        await run("shared pooled client", lambda: pooled_call(client), total, concurrency)
+    finally:
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    server = start_server()
+    try:
+        asyncio.run(main(args.requests, args.concurrency))
+    finally:
+        server.should_exit = True
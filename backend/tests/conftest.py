@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import breaker, quota  # noqa: E402
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # stands in for `time` in the modules that read time.monotonic()
+    clock = FakeClock()
+    monkeypatch.setattr(breaker, "time", clock)
+    monkeypatch.setattr(quota, "time", clock)
+    return clock
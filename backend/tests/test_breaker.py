@@ -0,0 +1,87 @@
+import pytest
+
+from app.utils.breaker import MIN_CALLS, OPEN_SECONDS, SLOW_CALL_SECONDS, CircuitBreaker, CircuitOpen
+
+
+def trip(breaker: CircuitBreaker):
+    for _ in range(MIN_CALLS):
+        breaker.record(False, 0.1)
+
+
+def test_stays_closed_below_min_calls(clock):
+    breaker = CircuitBreaker()
+    for _ in range(MIN_CALLS - 1):
+        breaker.record(False, 0.1)
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_opens_at_error_threshold(clock):
+    breaker = CircuitBreaker()
+    for i in range(MIN_CALLS):
+        breaker.record(i % 2 == 0, 0.1)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+
+def test_opens_on_slow_calls(clock):
+    breaker = CircuitBreaker()
+    for _ in range(MIN_CALLS):
+        breaker.record(True, SLOW_CALL_SECONDS + 1)
+    assert breaker.state == "open"
+
+
+def test_half_open_admits_a_single_probe(clock):
+    breaker = CircuitBreaker()
+    trip(breaker)
+    clock.now += OPEN_SECONDS - 1
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+    clock.now += 1
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+
+def test_probe_success_closes(clock):
+    breaker = CircuitBreaker()
+    trip(breaker)
+    clock.now += OPEN_SECONDS
+    breaker.before_call()
+    breaker.record(True, 0.1)
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_probe_failure_reopens(clock):
+    breaker = CircuitBreaker()
+    trip(breaker)
+    clock.now += OPEN_SECONDS
+    breaker.before_call()
+    breaker.record(False, 0.1)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+
+def test_lost_probe_is_replaced_after_open_seconds(clock):
+    breaker = CircuitBreaker()
+    trip(breaker)
+    clock.now += OPEN_SECONDS
+    breaker.before_call()
+    clock.now += OPEN_SECONDS
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+def test_released_probe_frees_the_slot(clock):
+    breaker = CircuitBreaker()
+    trip(breaker)
+    clock.now += OPEN_SECONDS
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+    assert breaker.state == "half_open"
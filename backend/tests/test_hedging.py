@@ -0,0 +1,98 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.utils import spoonacular
+from app.utils.breaker import MIN_CALLS, OPEN_SECONDS, CircuitBreaker
+from app.utils.quota import QuotaExceeded, QuotaManager
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    # a mock Spoonacular whose first call answers after `delays[0]`, the
+    # second after `delays[1]`; records which calls were cancelled
+    state = {"delays": [], "calls": 0, "cancelled": []}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        call = state["calls"]
+        state["calls"] += 1
+        try:
+            await asyncio.sleep(state["delays"][call])
+        except asyncio.CancelledError:
+            state["cancelled"].append(call)
+            raise
+        return httpx.Response(200, json={"call": call})
+
+    breaker = CircuitBreaker()
+    breaker._latencies.extend([0.01] * MIN_CALLS)
+    monkeypatch.setattr(spoonacular, "breaker", breaker)
+    monkeypatch.setattr(spoonacular, "quota", QuotaManager(rate=1000, burst=1000))
+    monkeypatch.setattr(spoonacular, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(spoonacular, "HEDGE_MIN_DELAY", 0.05)
+    monkeypatch.setattr(spoonacular, "_client", httpx.AsyncClient(
+        base_url="https://spoonacular.test", transport=httpx.MockTransport(handler),
+    ))
+    return state
+
+
+async def get(path: str = "/recipes/1/information") -> httpx.Response:
+    resp = await spoonacular.spoonacular_get(path)
+    await asyncio.sleep(0.01)  # let the loser's cancellation land
+    return resp
+
+
+def test_hedge_wins_and_primary_is_cancelled(upstream):
+    upstream["delays"] = [1.0, 0.0]
+    before = dict(spoonacular.hedge_stats)
+
+    resp = asyncio.run(get())
+
+    assert resp.json() == {"call": 1}
+    assert upstream["cancelled"] == [0]
+    assert spoonacular.hedge_stats["hedged"] == before["hedged"] + 1
+    assert spoonacular.hedge_stats["hedge_won"] == before["hedge_won"] + 1
+
+
+def test_primary_wins_and_hedge_is_cancelled(upstream):
+    upstream["delays"] = [0.1, 1.0]
+    before = dict(spoonacular.hedge_stats)
+
+    resp = asyncio.run(get())
+
+    assert resp.json() == {"call": 0}
+    assert upstream["cancelled"] == [1]
+    assert spoonacular.hedge_stats["hedged"] == before["hedged"] + 1
+    assert spoonacular.hedge_stats["hedge_won"] == before["hedge_won"]
+
+
+def test_no_hedge_without_spare_quota(upstream, monkeypatch):
+    upstream["delays"] = [0.1]
+    monkeypatch.setattr(spoonacular.quota, "try_acquire", lambda priority, cost: False)
+    before = dict(spoonacular.hedge_stats)
+
+    resp = asyncio.run(get())
+
+    assert resp.json() == {"call": 0}
+    assert upstream["calls"] == 1
+    assert spoonacular.hedge_stats == before
+
+
+def test_quota_refusal_releases_the_half_open_probe(upstream, monkeypatch, clock):
+    breaker = CircuitBreaker()
+    for _ in range(MIN_CALLS):
+        breaker.record(False, 0.1)
+    clock.now += OPEN_SECONDS
+    monkeypatch.setattr(spoonacular, "breaker", breaker)
+    quota = QuotaManager(rate=1, burst=10, daily_reserve=20)
+    quota.quota_left = 5  # too little left for background work
+    monkeypatch.setattr(spoonacular, "quota", quota)
+    upstream["delays"] = [0.0]
+
+    with pytest.raises(QuotaExceeded):
+        asyncio.run(spoonacular.spoonacular_get("/recipes/1/information", priority="background"))
+    assert upstream["calls"] == 0
+
+    resp = asyncio.run(spoonacular.spoonacular_get("/recipes/1/information"))
+    assert resp.json() == {"call": 0}
+    assert breaker.state == "closed"
@@ -0,0 +1,46 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.utils.quota import QuotaExceeded, QuotaManager
+
+
+def response(status: int = 200, **headers) -> httpx.Response:
+    return httpx.Response(status, headers={k.replace("_", "-"): str(v) for k, v in headers.items()})
+
+
+def test_background_refused_below_interactive_reserve(clock):
+    quota = QuotaManager(rate=0.01, burst=10, interactive_reserve=5)
+    for _ in range(5):
+        asyncio.run(quota.acquire("background"))
+
+    with pytest.raises(QuotaExceeded) as exc:
+        asyncio.run(quota.acquire("background"))
+    assert exc.value.status == 429
+    assert not quota.try_acquire("background")
+
+    # the reserve is still there for interactive callers
+    for _ in range(5):
+        asyncio.run(quota.acquire("interactive"))
+    assert not quota.try_acquire("interactive")
+
+
+def test_background_refused_when_daily_quota_low(clock):
+    quota = QuotaManager(rate=1, burst=10, interactive_reserve=5, daily_reserve=20)
+    quota.record(response(X_API_Quota_Left=15))
+
+    with pytest.raises(QuotaExceeded) as exc:
+        asyncio.run(quota.acquire("background"))
+    assert exc.value.status == 402
+    asyncio.run(quota.acquire("interactive"))
+
+
+def test_upstream_402_blocks_every_lane(clock):
+    quota = QuotaManager(rate=1, burst=10, interactive_reserve=5)
+    quota.record(response(402))
+
+    for priority in ("interactive", "background"):
+        with pytest.raises(QuotaExceeded):
+            asyncio.run(quota.acquire(priority))
+    assert quota.stats()["blocked_status"] == 402
@@ -0,0 +1,40 @@
+from app.search.index import RecipeSearchIndex
+
+
+def recipe(recipe_id: str, title: str) -> dict:
+    return {"_id": recipe_id, "title": title, "description": "", "ingredients": []}
+
+
+def ids(result: dict) -> set:
+    return {r["recipe_id"] for r in result["results"]}
+
+
+def test_every_term_must_match():
+    index = RecipeSearchIndex()
+    index.add(recipe("1", "garlic bread"))
+    index.add(recipe("2", "garlic soup"))
+    index.add(recipe("3", "tomato soup"))
+
+    assert ids(index.search("garlic soup")) == {"2"}
+    assert index.search("garlic soup")["total_results"] == 1
+
+
+def test_unknown_terms_are_ignored():
+    index = RecipeSearchIndex()
+    index.add(recipe("1", "garlic bread"))
+
+    assert ids(index.search("garlic zzzz")) == {"1"}
+
+
+def test_updates_and_removals_reach_cached_bitsets():
+    index = RecipeSearchIndex()
+    index.add(recipe("1", "garlic bread"))
+    index.add(recipe("2", "garlic soup"))
+    assert ids(index.search("garlic")) == {"1", "2"}
+
+    index.remove("1")
+    index.add(recipe("2", "tomato soup"))
+    index.add(recipe("3", "garlic noodles"))
+
+    assert ids(index.search("garlic")) == {"3"}
+    assert ids(index.search("soup")) == {"2"}